@@ -3,4 +3,4 @@ AI and machine learning components for the Tesla CRM application.
 """
 
 # Import AI components here
-# from .chatbot import RuleBasedChatbot
+from .chatbot import RuleBasedChatbot
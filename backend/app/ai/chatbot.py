@@ -0,0 +1,95 @@
+"""
+Rule-based chatbot that answers from the knowledge base (``kb_articles``).
+"""
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Pattern
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import SessionLocal
+
+DEFAULT_RESPONSE = (
+    "Gracias por tu mensaje. Déjanos tu nombre y número para coordinar "
+    "una visita técnica."
+)
+
+class KBIndex(NamedTuple):
+    """Keyword matcher built from the KB article tags."""
+    pattern: Optional[Pattern]
+    keywords: Dict[str, List[str]]
+    articles: Dict[str, str]
+
+_kb_index: Optional[KBIndex] = None
+_kb_index_lock = threading.Lock()
+
+def _build_kb_index() -> KBIndex:
+    """
+    Load every KB article once and compile all of their tags into a single
+    alternation, so a message is scanned for every keyword in one pass.
+    """
+    try:
+        with SessionLocal() as db:
+            rows = db.execute(
+                text("SELECT slug, title, body, tags FROM kb_articles")
+            ).all()
+    except SQLAlchemyError:
+        # No KB table yet (seed_kb.py not run): fall back to the default reply
+        rows = []
+
+    # A tag shared by several articles points to all of them
+    keywords: Dict[str, List[str]] = {}
+    articles: Dict[str, str] = {}
+    for slug, title, body, tags in rows:
+        articles[slug] = f"{title}: {body}"
+        for keyword in (tags or "").split(","):
+            keyword = keyword.strip().lower()
+            if keyword:
+                slugs = keywords.setdefault(keyword, [])
+                if slug not in slugs:
+                    slugs.append(slug)
+
+    pattern = None
+    if keywords:
+        # Longest first so multi-word tags win over their own prefixes
+        alternation = "|".join(
+            re.escape(k) for k in sorted(keywords, key=len, reverse=True)
+        )
+        pattern = re.compile(rf"\b(?:{alternation})\b")
+    return KBIndex(pattern, keywords, articles)
+
+def get_kb_index() -> KBIndex:
+    """Return the process-wide KB index, building it on first use."""
+    global _kb_index
+    if _kb_index is None:
+        with _kb_index_lock:
+            if _kb_index is None:
+                _kb_index = _build_kb_index()
+    return _kb_index
+
+def reload_kb_index() -> None:
+    """Drop the cached index so the next message picks up KB changes."""
+    global _kb_index
+    with _kb_index_lock:
+        _kb_index = None
+
+class RuleBasedChatbot:
+    """Answers with the KB article whose tags best match the message."""
+
+    def __init__(self):
+        self.index = get_kb_index()
+
+    def generate_response(self, message: str) -> str:
+        """Generate a response for a user message."""
+        if self.index.pattern is None:
+            return DEFAULT_RESPONSE
+
+        hits: Dict[str, int] = {}
+        for match in self.index.pattern.finditer(message.lower()):
+            for slug in self.index.keywords[match.group(0)]:
+                hits[slug] = hits.get(slug, 0) + 1
+
+        if not hits:
+            return DEFAULT_RESPONSE
+        return self.index.articles[max(hits, key=hits.get)]
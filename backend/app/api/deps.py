@@ -0,0 +1,34 @@
+"""
+Shared FastAPI dependencies for the API endpoints.
+"""
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.security import TokenData, get_current_user
+from app.database import get_db
+from app.models import User, UserStatus
+
+def get_current_active_user(
+    token_data: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Get the active user the token belongs to.
+    
+    The user is read on every request, so a deactivated or deleted account
+    is refused at once, whatever tokens it still holds. A plain ``def``: the
+    lookup is a blocking query, so FastAPI runs it in its threadpool.
+    """
+    user = db.query(User).filter(User.email == token_data.username).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if user.status != UserStatus.ACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return user
@@ -12,10 +12,10 @@ from app.schemas.user import User, UserCreate, UserUpdate, Token, TokenData
 from app.core.security import (
     get_password_hash,
     create_access_token,
-    verify_password,
-    get_current_active_user,
+    verify_password_async,
     get_current_user
 )
+from app.api.deps import get_current_active_user
 from app.core.config import settings
 from app.database import get_db
 from app.services import user_service
@@ -36,8 +36,7 @@ async def register_user(
     - **last_name**: User's last name
     """
     # Check if user with this email already exists
-    db_user = await user_service.get_user_by_email(db, email=user_in.email)
-    if db_user:
+    if await user_service.email_exists(db, email=user_in.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -142,8 +141,8 @@ async def change_password(
     - **current_password**: Current password for verification
     - **new_password**: New password (at least 8 characters)
     """
-    # Verify current password
-    if not verify_password(current_password, current_user.hashed_password):
+    # Verify current password (bcrypt is CPU-bound, keep it off the event loop)
+    if not await verify_password_async(current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
@@ -158,21 +157,16 @@ async def change_password(
 
 @router.post("/password/reset-request")
 async def request_password_reset(
-    email: str,
-    db: Session = Depends(get_db)
+    email: str
 ):
     """
     Request a password reset.
     
     Sends a password reset email to the user with a reset token.
     """
-    # This would typically send an email with a reset link
-    # For now, we'll just return a success message
-    user = await user_service.get_user_by_email(db, email=email)
-    if user:
-        # In a real app, generate a reset token and send an email
-        pass
-    
+    # Reset emails aren't sent yet, so there is nothing to look up. When they
+    # are, send them from a background task so the response time doesn't
+    # reveal whether the email is registered.
     # Return success regardless of whether the email exists to prevent user enumeration
     return {
         "message": "If your email is registered, you will receive a password reset link"
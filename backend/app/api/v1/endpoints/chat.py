@@ -9,7 +9,7 @@ from app.schemas.chat import (
     Message, MessageCreate, MessageUpdate,
     Conversation, ConversationCreate, ConversationUpdate, ChatResponse
 )
-from app.database import get_db
+from app.database import get_db, get_db_readonly
 from app.services import chat_service
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -35,23 +35,23 @@ async def create_conversation(
 
 @router.get("/conversations/", response_model=List[Conversation])
 async def list_conversations(
-    skip: int = 0,
+    after_id: Optional[int] = None,
     limit: int = 100,
     lead_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_readonly)
 ):
     """
     List all conversations with optional filtering.
     """
     return await chat_service.get_conversations(
-        db, skip=skip, limit=limit, lead_id=lead_id, status=status
+        db, after_id=after_id, limit=limit, lead_id=lead_id, status=status
     )
 
 @router.get("/conversations/{conversation_id}", response_model=Conversation)
 async def get_conversation(
     conversation_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_readonly)
 ):
     """
     Get a specific conversation by ID.
@@ -102,15 +102,15 @@ async def create_message(
 @router.get("/conversations/{conversation_id}/messages", response_model=List[Message])
 async def get_conversation_messages(
     conversation_id: int,
-    skip: int = 0,
+    after_id: Optional[int] = None,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_readonly)
 ):
     """
     Get all messages in a conversation.
     """
     return await chat_service.get_messages(
-        db, conversation_id=conversation_id, skip=skip, limit=limit
+        db, conversation_id=conversation_id, after_id=after_id, limit=limit
     )
 
 @router.post("/send-message/", response_model=ChatResponse)
@@ -1,60 +1,115 @@
 """
 Dashboard endpoints for Tesla CRM API.
 """
+import os
+import threading
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta
 
-from ....database import get_db
-from ....models import Lead, User, ActivityLog
-from ....schemas.dashboard import DashboardStats
+from ....database import get_db_readonly
+from ....models import Lead, User, UserStatus, ActivityLog
+from ....schemas.lead import LeadStatus
+from ....schemas.dashboard import ActivityLogBase, DashboardStats
 
 router = APIRouter()
 
-@router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(
-    db: Session = Depends(get_db)
-) -> Dict[str, Any]:
+# Seconds the computed stats are served from memory. The numbers change
+# slowly, and the UI polls this endpoint.
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 30))
+
+_dashboard_cache: TTLCache = TTLCache(maxsize=1, ttl=max(DASHBOARD_CACHE_TTL, 1))
+# Only held around a get or set on the cache, never while querying
+_dashboard_cache_lock = threading.Lock()
+# Held while the stats are being computed, so concurrent misses run the
+# queries once
+_dashboard_compute_lock = threading.Lock()
+
+@router.get("/dashboard/stats", response_model=DashboardStats, response_class=ORJSONResponse)
+def get_dashboard_stats(
+    db: Session = Depends(get_db_readonly)
+) -> DashboardStats:
     """
     Get dashboard statistics including lead counts, recent activities, and metrics.
+
+    Declared as a plain ``def`` so FastAPI runs it in the threadpool; the
+    queries below go through a blocking ``Session`` and would otherwise
+    stall the event loop.
     """
+    if DASHBOARD_CACHE_TTL <= 0:
+        return _compute_dashboard_stats(db)
+    
+    with _dashboard_cache_lock:
+        stats = _dashboard_cache.get("stats")
+    if stats is None:
+        # Concurrent misses wait here and then hit the fresh entry, rather
+        # than all recomputing the stats at once
+        with _dashboard_compute_lock:
+            with _dashboard_cache_lock:
+                stats = _dashboard_cache.get("stats")
+            if stats is None:
+                stats = _compute_dashboard_stats(db)
+                with _dashboard_cache_lock:
+                    _dashboard_cache["stats"] = stats
+    return stats
+
+def _compute_dashboard_stats(db: Session) -> DashboardStats:
+    """Run the dashboard queries and build the stats payload."""
     try:
-        # Get total leads count
-        total_leads = db.query(Lead).count()
-        
-        # Get new leads (last 7 days)
         week_ago = datetime.utcnow() - timedelta(days=7)
-        new_leads = db.query(Lead).filter(Lead.created_at >= week_ago).count()
         
-        # Get active users count
-        active_users = db.query(User).filter(User.is_active == True).count()  # noqa: E712
+        # Active users as a scalar subquery so it rides along with the lead
+        # aggregates instead of costing its own round-trip. User has no
+        # is_active column; an active account is one whose status is ACTIVE
+        active_users_count = (
+            select(func.count(User.id))
+            .where(User.status == UserStatus.ACTIVE)
+            .scalar_subquery()
+        )
+        
+        # Total, new (last 7 days) and converted leads in a single pass. A
+        # converted lead is a WON one; "converted" is not a lead status
+        counts = db.query(
+            func.count(Lead.id).label("total_leads"),
+            func.coalesce(
+                func.sum(case((Lead.created_at >= week_ago, 1), else_=0)), 0
+            ).label("new_leads"),
+            func.coalesce(
+                func.sum(case((Lead.status == LeadStatus.WON, 1), else_=0)), 0
+            ).label("converted_leads"),
+            active_users_count.label("active_users"),
+        ).one()
+        
+        total_leads = counts.total_leads
+        new_leads = counts.new_leads
+        active_users = counts.active_users
         
-        # Get recent activities
+        # Get recent activities, joining in the acting user so the names
+        # don't trigger a lazy load per row
         recent_activities = db.query(ActivityLog)\
+            .options(joinedload(ActivityLog.user))\
             .order_by(ActivityLog.created_at.desc())\
             .limit(5)\
             .all()
             
-        # Calculate conversion rate (example: leads to customers)
-        converted_leads = db.query(Lead).filter(Lead.status == "converted").count()
-        conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
+        # Calculate conversion rate (leads to customers)
+        conversion_rate = (
+            (counts.converted_leads / total_leads * 100) if total_leads > 0 else 0
+        )
         
-        return {
-            "total_leads": total_leads,
-            "new_leads": new_leads,
-            "active_users": active_users,
-            "conversion_rate": round(conversion_rate, 2),
-            "recent_activities": [
-                {
-                    "id": activity.id,
-                    "action": activity.action,
-                    "created_at": activity.created_at.isoformat(),
-                    "user_id": activity.user_id
-                }
+        return DashboardStats(
+            total_leads=total_leads,
+            new_leads=new_leads,
+            active_users=active_users,
+            conversion_rate=round(conversion_rate, 2),
+            recent_activities=[
+                ActivityLogBase.model_validate(activity)
                 for activity in recent_activities
             ]
-        }
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -6,13 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from app.schemas.lead import Lead, LeadCreate, LeadUpdate, LeadListResponse, LeadStatus, LeadSource
-from app.database import get_db
+from app.database import get_db, get_db_readonly
 from app.services import lead_service
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
 @router.post("/", response_model=Lead, status_code=status.HTTP_201_CREATED)
-async def create_lead(
+def create_lead(
     lead: LeadCreate,
     db: Session = Depends(get_db)
 ):
@@ -31,53 +31,70 @@ async def create_lead(
     - **notes**: Additional notes about the lead (optional)
     """
     try:
-        return await lead_service.create_lead(db, lead)
+        return lead_service.create_lead(db, lead)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
+def _bad_request(detail: str) -> HTTPException:
+    """400 response for invalid query parameters."""
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
 @router.get("/", response_model=LeadListResponse)
-async def list_leads(
+def list_leads(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, le=1000, description="Maximum number of records to return"),
-    status: Optional[LeadStatus] = None,
-    source: Optional[LeadSource] = None,
-    assigned_to: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    status: Optional[List[LeadStatus]] = Query(None, description="Filter by one or more statuses"),
+    source: Optional[List[LeadSource]] = Query(None, description="Filter by one or more sources"),
+    assigned_to: Optional[List[int]] = Query(None, description="Filter by one or more assignee ids"),
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Return leads after this cursor (next_cursor of the previous page)"),
+    include_total: bool = Query(False, description="Also count all matching leads (slower on large tables)"),
+    db: Session = Depends(get_db_readonly)
 ):
     """
     List all leads with optional filtering and pagination.
+    
+    ``has_more`` tells whether another page follows; ``total`` and ``pages``
+    are only filled in when ``include_total`` is set.
     """
-    result = await lead_service.get_leads(
-        db,
-        skip=skip,
-        limit=limit,
-        status=status,
-        source=source,
-        assigned_to=assigned_to,
-        search=search
-    )
+    try:
+        result = lead_service.get_leads(
+            db,
+            skip=skip,
+            limit=limit,
+            status=status,
+            source=source,
+            assigned_to=assigned_to,
+            search=search,
+            cursor=cursor,
+            with_total=include_total
+        )
+    except ValueError as e:
+        # A malformed cursor; the ``status`` filter shadows fastapi.status here
+        raise _bad_request(str(e))
     
     return {
         "items": result["items"],
         "total": result["total"],
         "page": (skip // limit) + 1,
         "size": limit,
-        "pages": (result["total"] + limit - 1) // limit if limit > 0 else 0
+        "pages": (result["total"] + limit - 1) // limit if result["total"] is not None else None,
+        "has_more": result["has_more"],
+        "next_cursor": result["next_cursor"]
     }
 
 @router.get("/{lead_id}", response_model=Lead)
-async def get_lead(
+def get_lead(
     lead_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_readonly)
 ):
     """
     Get a specific lead by ID.
     """
-    lead = await lead_service.get_lead(db, lead_id)
+    lead = lead_service.get_lead(db, lead_id)
     if not lead:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -86,7 +103,7 @@ async def get_lead(
     return lead
 
 @router.put("/{lead_id}", response_model=Lead)
-async def update_lead(
+def update_lead(
     lead_id: int,
     lead_update: LeadUpdate,
     db: Session = Depends(get_db)
@@ -96,7 +113,7 @@ async def update_lead(
     
     Only the fields provided in the request will be updated.
     """
-    updated_lead = await lead_service.update_lead(db, lead_id, lead_update)
+    updated_lead = lead_service.update_lead(db, lead_id, lead_update)
     if not updated_lead:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,7 +122,7 @@ async def update_lead(
     return updated_lead
 
 @router.delete("/{lead_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_lead(
+def delete_lead(
     lead_id: int,
     db: Session = Depends(get_db)
 ):
@@ -114,7 +131,7 @@ async def delete_lead(
     
     This will also delete all associated conversations and messages.
     """
-    success = await lead_service.delete_lead(db, lead_id)
+    success = lead_service.delete_lead(db, lead_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -123,7 +140,7 @@ async def delete_lead(
     return None
 
 @router.post("/{lead_id}/convert-to-customer", response_model=Lead)
-async def convert_lead_to_customer(
+def convert_lead_to_customer(
     lead_id: int,
     db: Session = Depends(get_db)
 ):
@@ -133,7 +150,7 @@ async def convert_lead_to_customer(
     This will change the lead's status to 'won' and create a new customer record.
     """
     try:
-        return await lead_service.convert_to_customer(db, lead_id)
+        return lead_service.convert_to_customer(db, lead_id)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -146,27 +163,29 @@ async def convert_lead_to_customer(
         )
 
 @router.get("/sources/stats/")
-async def get_lead_source_stats(
+def get_lead_source_stats(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, description="Only return the top sources by conversion rate"),
+    db: Session = Depends(get_db_readonly)
 ):
     """
     Get statistics about lead sources.
     
-    Returns a breakdown of leads by source, with counts and conversion rates.
+    Returns a breakdown of leads by source, with counts and conversion rates,
+    best conversion rate first.
     """
-    return await lead_service.get_lead_source_stats(db, start_date, end_date)
+    return lead_service.get_lead_source_stats(db, start_date, end_date, limit)
 
 @router.get("/status/stats/")
-async def get_lead_status_stats(
+def get_lead_status_stats(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_readonly)
 ):
     """
     Get statistics about lead statuses.
     
     Returns a breakdown of leads by status, with counts and trends.
     """
-    return await lead_service.get_lead_status_stats(db, start_date, end_date)
+    return lead_service.get_lead_status_stats(db, start_date, end_date)
@@ -1,8 +1,11 @@
 """
 Security-related functionality for the Tesla CRM application.
 """
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -17,8 +20,21 @@ SECRET_KEY = "your-secret-key-here"  # In production, use environment variables
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# bcrypt work factor for new hashes, bcrypt's own default of 12 unless set.
+# Each -1 halves both the login time and the cost of brute-forcing a leaked
+# hash, so only lower it deliberately. Existing hashes keep verifying, since
+# the cost is stored in the hash itself.
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", 12))
+
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_COST)
+
+# bcrypt is CPU-bound and takes tens of milliseconds per call. Async code runs
+# it on this dedicated pool, one thread per core, so concurrent logins neither
+# block the event loop nor take threads from the default pool.
+_bcrypt_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 4, thread_name_prefix="bcrypt"
+)
 
 class Token(BaseModel):
     access_token: str
@@ -35,6 +51,18 @@ def get_password_hash(password: str) -> str:
     """Generate a password hash."""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _bcrypt_executor, verify_password, plain_password, hashed_password
+    )
+
+async def get_password_hash_async(password: str) -> str:
+    """Generate a password hash without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -46,6 +74,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """Decode and verify a JWT access token; raises JWTError if it is invalid."""
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """Get the current user from the token."""
     credentials_exception = HTTPException(
@@ -54,7 +86,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -62,9 +94,4 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
 
-    # Here you would typically fetch the user from your database
-    # user = get_user(fake_users_db, username=token_data.username)
-    # if user is None:
-    #     raise credentials_exception
-    # return user
     return token_data
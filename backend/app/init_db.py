@@ -9,6 +9,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from .database import Base, engine
 from .models import User, UserRole, Lead, Conversation, Message, ActivityLog
+from .models.leaderboard import ensure_leaderboard_view
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +21,7 @@ def init_db() -> None:
         # Create all tables
         logger.info("Creating database tables...")
         Base.metadata.create_all(bind=engine)
+        ensure_leaderboard_view(engine)
         logger.info("Database tables created successfully.")
         
     except SQLAlchemyError as e:
@@ -2,21 +2,23 @@
 Main FastAPI application for the Tesla CRM API.
 """
 import os
+import asyncio
 import logging
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import OAuth2PasswordBearer
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from starlette.middleware.sessions import SessionMiddleware
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 # Import database and models to ensure tables are created
-from .database import engine, Base
+# (app.database also loads .env, once, for the whole application)
+from .database import engine, Base, pool_status, warm_connection_pool
 from .models import *  # noqa
+from .models.leaderboard import ensure_leaderboard_view
+
+ENV_NAME = os.getenv("ENV", "development")
 
 # Import routers
 from .api.v1 import router as api_router
@@ -25,11 +27,53 @@ from .api.v1 import router as api_router
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Seconds between refreshes of the leaderboard materialized view (PostgreSQL)
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", 300))
 
-# OAuth2 scheme for token authentication
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
+async def _refresh_leaderboard_periodically():
+    """Keep the leaderboard view at most LEADERBOARD_REFRESH_SECONDS stale."""
+    # Imported here, like the routers, so importing app.main stays light
+    from .services.metrics_service import metrics_service
+    
+    while True:
+        await asyncio.sleep(LEADERBOARD_REFRESH_SECONDS)
+        try:
+            await run_in_threadpool(metrics_service.refresh_leaderboard_view)
+        except Exception as e:
+            logger.error(f"Error refreshing the leaderboard view: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables, seed data and fill the connection pool once, keep the
+    leaderboard view refreshed, then dispose the pool on exit."""
+    from .init_db import create_initial_data
+    
+    logger.info("Starting up Tesla CRM API...")
+    
+    # Create database tables, and on PostgreSQL the leaderboard view
+    Base.metadata.create_all(bind=engine)
+    ensure_leaderboard_view(engine)
+    
+    try:
+        # Create initial data if needed
+        create_initial_data()
+        logger.info("Initial data check completed.")
+    except Exception as e:
+        logger.error(f"Error during startup: {e}")
+        raise
+    
+    await run_in_threadpool(warm_connection_pool)
+    
+    refresher = None
+    if engine.dialect.name == "postgresql":
+        refresher = asyncio.create_task(_refresh_leaderboard_periodically())
+    
+    yield
+    
+    logger.info("Shutting down Tesla CRM API...")
+    if refresher is not None:
+        refresher.cancel()
+    engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -38,9 +82,17 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Middleware, innermost first (Starlette wraps each new one around the last).
+# Session cookies are not used anywhere, so there is no SessionMiddleware.
+
+# Compress larger payloads (lead lists, message history, activity logs)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -50,24 +102,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include API router
-app.include_router(api_router)
+# Trusted Hosts middleware, outermost so bad hosts are rejected first.
+# With the default "*" it would accept everything, so it is skipped.
+ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "*").split("|")
+if "*" not in ALLOWED_HOSTS:
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=ALLOWED_HOSTS)
 
-# Trusted Hosts middleware
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=os.getenv("ALLOWED_HOSTS", "*").split("|"),
-)
-
-# Session middleware
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=os.getenv("SECRET_KEY", "your-secret-key-here"),
-    session_cookie="tesla_session",
-)
-
-# Include API routers
-app.include_router(api_router, prefix="/api/v1")
+# Include API router (it already carries the /api/v1 prefix)
+app.include_router(api_router)
 
 # Health check endpoint
 @app.get("/healthz", tags=["health"])
@@ -76,7 +118,8 @@ async def health_check():
     return {
         "status": "ok",
         "version": "0.1.0",
-        "environment": os.getenv("ENV", "development"),
+        "environment": ENV_NAME,
+        "db_pool": pool_status(),
     }
 
 # Root endpoint
@@ -89,34 +132,3 @@ async def root():
         "docs": "/api/docs",
         "redoc": "/api/redoc"
     }
-
-# Add exception handlers
-@app.exception_handler(HTTPException)
-async def http_exception_handler(request, exc):
-    """Handle HTTP exceptions with a JSON response."""
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={"detail": exc.detail},
-    )
-
-# Add startup event to initialize data
-@app.on_event("startup")
-def startup_event():
-    """Initialize data when the application starts."""
-    from .init_db import create_initial_data
-    
-    logger.info("Starting up Tesla CRM API...")
-    
-    try:
-        # Create initial data if needed
-        create_initial_data()
-        logger.info("Initial data check completed.")
-    except Exception as e:
-        logger.error(f"Error during startup: {e}")
-        raise
-
-# Add shutdown event
-@app.on_event("shutdown")
-def shutdown_event():
-    """Clean up when the application shuts down."""
-    logger.info("Shutting down Tesla CRM API...")
@@ -8,6 +8,7 @@ from .user import User, UserRole, UserStatus
 from .lead import Lead
 from .conversation import Conversation, Message
 from .activity import ActivityLog
+from .leaderboard import user_leaderboard
 
 # Make all models available for Alembic migrations
 __all__ = [
@@ -19,4 +20,5 @@ __all__ = [
     'Conversation',
     'Message',
     'ActivityLog',
+    'user_leaderboard',
 ]
@@ -3,10 +3,10 @@ Activity Log model for tracking user and system activities.
 """
 from datetime import datetime
 from typing import Dict, Any, Optional
-from sqlalchemy import Column, String, Integer, Text, JSON, DateTime, ForeignKey, Index
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
-from .base import Base
+from .base import Base, JSONType
 
 class ActivityLog(Base):
     """
@@ -62,7 +62,7 @@ class ActivityLog(Base):
     )
     
     details = Column(
-        JSON,
+        JSONType,
         nullable=True,
         comment="Additional details about the activity in JSON format"
     )
@@ -71,12 +71,28 @@ class ActivityLog(Base):
     __table_args__ = (
         # Composite index for querying by entity
         Index('ix_activity_logs_entity', 'entity_type', 'entity_id'),
-        # Index for querying by user and time
-        Index('ix_activity_logs_user_time', 'user_id', 'created_at'),
+        # Index for querying by user and time (action included on PostgreSQL
+        # so the per-user activity metrics are index-only scans)
+        Index(
+            'ix_activity_logs_user_time', 'user_id', 'created_at',
+            postgresql_include=['action'],
+        ),
         # Index for querying by action and time
         Index('ix_activity_logs_action_time', 'action', 'created_at'),
+        # Index for the newest-first feed (ORDER BY created_at DESC, id DESC
+        # LIMIT n, seeking past a cursor) and date-range activity metrics
+        # (covering on PostgreSQL)
+        Index(
+            'ix_activity_logs_created', 'created_at', 'id',
+            postgresql_include=['action'],
+        ),
     )
     
+    @property
+    def user_name(self) -> Optional[str]:
+        """Full name of the user who performed the action, if any."""
+        return self.user.full_name if self.user else None
+    
     def __repr__(self):
         return f"<ActivityLog {self.action} by {self.user_id or 'system'}>"
     
@@ -105,6 +121,9 @@ class ActivityLog(Base):
         """
         Helper method to log an activity.
         
+        The entry is only added to the session: the caller's commit writes it
+        in the same transaction as the change it records.
+        
         Args:
             db_session: Database session
             action: The action being logged
@@ -129,6 +148,5 @@ class ActivityLog(Base):
         )
         
         db_session.add(activity)
-        db_session.commit()
         
         return activity
@@ -2,12 +2,18 @@
 Base SQLAlchemy models for the Tesla CRM application.
 """
 from datetime import datetime
-from typing import Any, Dict, Optional
-from sqlalchemy import Column, Integer, DateTime, func
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import Column, Integer, DateTime, JSON, func, inspect
+from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
+# JSON column type: binary JSONB on PostgreSQL (no re-parse on read, GIN
+# indexable), plain JSON everywhere else
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 @as_declarative()
 class Base:
     """Base class for all database models."""
@@ -21,18 +27,54 @@ class Base:
     
     __name__: str
     
+    # Fetch server-generated values (id, timestamps) with RETURNING as part of
+    # the INSERT/UPDATE, so they are loaded without a refresh() afterwards
+    __mapper_args__ = {"eager_defaults": True}
+    
     # Generate __tablename__ automatically
     @declared_attr
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
     
+    # Column names left out of to_dict() (e.g. password hashes)
+    _to_dict_exclude: Tuple[str, ...] = ()
+    
+    @classmethod
+    def _column_fields(cls) -> Tuple[Tuple[Tuple[str, str], ...], Tuple[str, ...]]:
+        """
+        (column name, attribute name) pairs for the mapped table columns, plus
+        the names of the Enum columns among them, computed once per model.
+        The column name is used as the dict key, so attributes renamed on the
+        model (e.g. ``metadata_``) come out under their column name. SQL
+        expression attributes (``column_property``) are left out.
+        """
+        cached = cls.__dict__.get('_column_fields_cache')
+        if cached is None:
+            props = [
+                prop for prop in inspect(cls).column_attrs
+                if isinstance(prop.columns[0], Column)
+                and not prop.columns[0].name.startswith('_')
+                and prop.columns[0].name not in cls._to_dict_exclude
+            ]
+            cached = (
+                tuple((prop.columns[0].name, prop.key) for prop in props),
+                tuple(
+                    prop.columns[0].name for prop in props
+                    if isinstance(prop.columns[0].type, SQLEnum)
+                ),
+            )
+            cls._column_fields_cache = cached
+        return cached
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         Convert model instance to dictionary.
-        Excludes SQLAlchemy internal attributes.
+        Excludes SQLAlchemy internal attributes; Enum columns are emitted as
+        their values.
         """
-        return {
-            c.name: getattr(self, c.name)
-            for c in self.__table__.columns
-            if not c.name.startswith('_')
-        }
+        fields, enum_fields = self._column_fields()
+        result = {name: getattr(self, key) for name, key in fields}
+        for name in enum_fields:
+            value = result[name]
+            result[name] = value.value if value is not None else None
+        return result
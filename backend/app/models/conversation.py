@@ -3,10 +3,10 @@ Conversation and Message models for the Tesla CRM application.
 """
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum, JSON, DateTime, Boolean
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 
-from .base import Base
+from .base import Base, JSONType
 
 class Conversation(Base):
     """
@@ -36,7 +36,7 @@ class Conversation(Base):
     )
     
     # Metadata
-    metadata_ = Column('metadata', JSON, default=dict, nullable=False)
+    metadata_ = Column('metadata', JSONType, default=dict, nullable=False)
     
     # Relationships
     lead = relationship("Lead", back_populates="conversations")
@@ -47,6 +47,12 @@ class Conversation(Base):
         order_by="Message.created_at.asc()"
     )
     
+    # Indexes
+    __table_args__ = (
+        # Conversations of a lead filtered by status
+        Index('ix_conversations_lead_status', 'lead_id', 'status'),
+    )
+    
     def __repr__(self):
         return f"<Conversation {self.id} - {self.title or 'Untitled'}>"
     
@@ -54,10 +60,6 @@ class Conversation(Base):
         """Convert conversation to dictionary with proper type handling."""
         result = super().to_dict()
         
-        # Handle metadata
-        if 'metadata_' in result:
-            result['metadata'] = result.pop('metadata_')
-            
         # Include messages if loaded
         if self.messages:
             result['messages'] = [msg.to_dict() for msg in self.messages]
@@ -108,20 +110,16 @@ class Message(Base):
     )
     
     # Metadata
-    metadata_ = Column('metadata', JSON, default=dict, nullable=False)
+    metadata_ = Column('metadata', JSONType, default=dict, nullable=False)
     
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
     
+    # Indexes
+    __table_args__ = (
+        # Keyset pagination of a conversation's messages
+        Index('ix_messages_conversation_id_id', 'conversation_id', 'id'),
+    )
+    
     def __repr__(self):
         return f"<Message {self.id} from {self.sender}>"
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert message to dictionary with proper type handling."""
-        result = super().to_dict()
-        
-        # Handle metadata
-        if 'metadata_' in result:
-            result['metadata'] = result.pop('metadata_')
-            
-        return result
@@ -3,20 +3,26 @@ Lead model for the Tesla CRM application.
 """
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from sqlalchemy import Column, String, Text, Enum, Integer, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import DDL, Column, String, Text, Enum, Integer, ForeignKey, Index, event, func
+from sqlalchemy.orm import column_property, relationship
 import json
 
-from .base import Base
+from .base import Base, JSONType
 from app.schemas.lead import LeadStatus, LeadSource
 
+# Enum values stored in the DB, computed once instead of on every inspection
+_LEAD_STATUS_VALUES = [e.value for e in LeadStatus]
+_LEAD_SOURCE_VALUES = [e.value for e in LeadSource]
+
 class Lead(Base):
     """Lead model representing potential customers or clients."""
     __tablename__ = "leads"
     
     # Basic Information
     first_name = Column(String(100), nullable=False, index=True)
-    last_name = Column(String(100), nullable=False, index=True)
+    last_name = Column(String(100), nullable=False)
+    # Built by the database in the same SELECT that loads the row
+    full_name = column_property(first_name + " " + last_name)
     email = Column(String(255), unique=True, index=True, nullable=True)
     phone = Column(String(50), index=True, nullable=True)
     company = Column(String(200), nullable=True)
@@ -24,29 +30,26 @@ class Lead(Base):
     
     # Lead Details
     status = Column(
-        Enum(LeadStatus, values_callable=lambda x: [e.value for e in LeadStatus]),
+        Enum(LeadStatus, values_callable=lambda x: _LEAD_STATUS_VALUES),
         default=LeadStatus.NEW,
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     source = Column(
-        Enum(LeadSource, values_callable=lambda x: [e.value for e in LeadSource]),
+        Enum(LeadSource, values_callable=lambda x: _LEAD_SOURCE_VALUES),
         default=LeadSource.WEBSITE,
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     assigned_to = Column(
         Integer,
         ForeignKey('users.id', ondelete='SET NULL'),
-        nullable=True,
-        index=True
+        nullable=True
     )
     
     # Additional Information
     notes = Column(Text, nullable=True)
-    metadata_ = Column('metadata', JSON, default=dict, nullable=False)
+    metadata_ = Column('metadata', JSONType, default=dict, nullable=False)
     
     # Relationships
     assigned_user = relationship("User", back_populates="assigned_leads", foreign_keys=[assigned_to])
@@ -54,32 +57,62 @@ class Lead(Base):
     # Relationships
     conversations = relationship("Conversation", back_populates="lead", cascade="all, delete-orphan")
     
-    # Indexes
+    # Indexes (status, source, assigned_to and last_name are covered as the
+    # leading column of a composite below, so they have no single-column index)
     __table_args__ = (
-        # Add composite index for common search patterns
+        # Status filter with newest-first / date-range scans
+        Index('ix_leads_status_created', 'status', 'created_at'),
+        # Source filter with newest-first / date-range scans
+        Index('ix_leads_source_created', 'source', 'created_at'),
+        # Per-agent lead lists and metrics over a date range; unassigned
+        # leads are never looked up by agent, so they are left out. On
+        # PostgreSQL status/source ride along so the metrics' status/source
+        # group-bys are answered from the index alone.
+        Index(
+            'ix_leads_assigned_created', 'assigned_to', 'created_at',
+            postgresql_where=assigned_to.isnot(None),
+            sqlite_where=assigned_to.isnot(None),
+            postgresql_include=['status', 'source'],
+        ),
+        # Unfiltered date-range counts/time series and newest-first listing
+        # (covering for the metrics group-bys on PostgreSQL, as above)
+        Index(
+            'ix_leads_created', 'created_at', 'id',
+            postgresql_include=['status', 'source'],
+        ),
+        # "My open leads": assignee plus status filter
+        Index('ix_leads_assigned_status', 'assigned_to', 'status'),
+        # Name search/sort by surname, then first name
+        Index('ix_leads_name', 'last_name', 'first_name'),
+        # Containment (@>) filters on metadata; PostgreSQL only
+        Index('ix_leads_metadata_gin', 'metadata', postgresql_using='gin').ddl_if(dialect='postgresql'),
         {'mysql_charset': 'utf8mb4', 'mysql_engine': 'InnoDB'}
     )
     
     def __repr__(self):
         return f"<Lead {self.first_name} {self.last_name} ({self.status})>"
-    
-    @property
-    def full_name(self) -> str:
-        """Return the full name of the lead."""
-        return f"{self.first_name} {self.last_name}"
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert lead to dictionary with proper type handling."""
-        result = super().to_dict()
-        
-        # Convert enums to their values
-        if 'status' in result:
-            result['status'] = self.status.value if self.status else None
-        if 'source' in result:
-            result['source'] = self.source.value if self.source else None
-            
-        # Handle metadata
-        if 'metadata_' in result:
-            result['metadata'] = result.pop('metadata_')
-            
-        return result
+
+# Searchable fields joined into one string, so a search is a single ILIKE
+# instead of one per column. On PostgreSQL a pg_trgm GIN index on the same
+# expression serves the leading-wildcard match.
+LEAD_SEARCH_TEXT = (
+    func.coalesce(Lead.__table__.c.first_name, '') + ' '
+    + func.coalesce(Lead.__table__.c.last_name, '') + ' '
+    + func.coalesce(Lead.__table__.c.email, '') + ' '
+    + func.coalesce(Lead.__table__.c.phone, '') + ' '
+    + func.coalesce(Lead.__table__.c.company, '')
+)
+
+Index(
+    'ix_leads_search_trgm',
+    LEAD_SEARCH_TEXT.label('search_text'),
+    postgresql_using='gin',
+    postgresql_ops={'search_text': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+
+event.listen(
+    Lead.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
+
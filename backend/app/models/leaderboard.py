@@ -0,0 +1,80 @@
+"""
+Per-user, per-day leaderboard counts for the Tesla CRM application.
+
+On PostgreSQL they are precomputed in a materialized view, refreshed on a
+schedule, so the leaderboard sums a few rows per user instead of joining
+users, leads and activity logs on every request. Its counts therefore lag
+lead and activity writes by up to LEADERBOARD_REFRESH_SECONDS.
+"""
+from sqlalchemy import DDL, Date, Integer, column, event, table, text
+
+from .base import Base
+
+LEADERBOARD_VIEW = "mv_user_leaderboard"
+
+# Lightweight table construct for querying the view; it is not part of the
+# metadata, so create_all() leaves it to ensure_leaderboard_view()
+user_leaderboard = table(
+    LEADERBOARD_VIEW,
+    column("user_id", Integer),
+    column("day", Date),
+    column("lead_count", Integer),
+    column("converted_leads", Integer),
+    column("contacts_made", Integer),
+    column("meetings_scheduled", Integer),
+)
+
+_CREATE_LEADERBOARD_VIEW = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {LEADERBOARD_VIEW} AS
+SELECT user_id, day,
+       SUM(lead_count)::int AS lead_count,
+       SUM(converted_leads)::int AS converted_leads,
+       SUM(contacts_made)::int AS contacts_made,
+       SUM(meetings_scheduled)::int AS meetings_scheduled
+FROM (
+    SELECT assigned_to AS user_id, created_at::date AS day,
+           COUNT(*) AS lead_count,
+           COUNT(*) FILTER (WHERE status = 'won') AS converted_leads,
+           0 AS contacts_made, 0 AS meetings_scheduled
+    FROM leads WHERE assigned_to IS NOT NULL
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT user_id, created_at::date,
+           0, 0,
+           COUNT(*) FILTER (WHERE action = 'lead.contacted'),
+           COUNT(*) FILTER (WHERE action = 'meeting.scheduled')
+    FROM activity_logs
+    WHERE user_id IS NOT NULL AND action IN ('lead.contacted', 'meeting.scheduled')
+    GROUP BY 1, 2
+) AS daily
+GROUP BY user_id, day
+"""
+
+# REFRESH ... CONCURRENTLY needs a unique index covering every row
+_CREATE_LEADERBOARD_INDEX = f"""
+CREATE UNIQUE INDEX IF NOT EXISTS ux_{LEADERBOARD_VIEW}_user_day
+ON {LEADERBOARD_VIEW} (user_id, day)
+"""
+
+# Rebuilds the view without locking out readers
+REFRESH_LEADERBOARD_VIEW = f"REFRESH MATERIALIZED VIEW CONCURRENTLY {LEADERBOARD_VIEW}"
+
+def ensure_leaderboard_view(bind) -> None:
+    """
+    Create the view and its index if they don't exist yet (PostgreSQL only).
+    
+    Called explicitly after create_all() on every startup, so a database
+    created before the view existed gets it too.
+    """
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        conn.execute(text(_CREATE_LEADERBOARD_VIEW))
+        conn.execute(text(_CREATE_LEADERBOARD_INDEX))
+
+# The view reads several tables, so it is dropped before any of them is
+event.listen(
+    Base.metadata,
+    'before_drop',
+    DDL(f"DROP MATERIALIZED VIEW IF EXISTS {LEADERBOARD_VIEW}").execute_if(dialect='postgresql'),
+)
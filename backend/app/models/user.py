@@ -4,12 +4,13 @@ User model for authentication and authorization.
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from enum import Enum, Enum as PyEnum
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey, Text, Index
+from sqlalchemy import DDL, Column, String, Boolean, Integer, DateTime, ForeignKey, Text, Index, event
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 import bcrypt
 
 from .base import Base
+from app.core.security import BCRYPT_COST
 
 class UserRole(PyEnum):
     """User roles for authorization."""
@@ -36,6 +37,8 @@ class User(Base):
     # User Information
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
+    # Built by the database in the same SELECT that loads the row
+    full_name = column_property(first_name + " " + last_name)
     
     # Contact Information
     phone = Column(String(50), nullable=True)
@@ -64,6 +67,9 @@ class User(Base):
     assigned_leads = relationship("Lead", back_populates="assigned_user", foreign_keys="Lead.assigned_to")
     activities = relationship("ActivityLog", back_populates="user")
     
+    # Never serialized by to_dict()
+    _to_dict_exclude = ('hashed_password',)
+    
     # Indexes
     __table_args__ = (
         # Add composite index for common search patterns
@@ -80,18 +86,13 @@ class User(Base):
     def __repr__(self):
         return f"<User {self.email} ({self.role})>"
     
-    @property
-    def full_name(self) -> str:
-        """Return the full name of the user."""
-        return f"{self.first_name} {self.last_name}"
-    
     def set_password(self, password: str) -> None:
         """Hash and set the user's password."""
         if not password:
             raise ValueError("Password cannot be empty")
         
         # Generate a salt and hash the password
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_COST)
         self.hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
     
     def check_password(self, password: str) -> bool:
@@ -104,16 +105,30 @@ class User(Base):
         """Convert user to dictionary, excluding sensitive information."""
         result = super().to_dict()
         
-        # Remove sensitive information
-        result.pop('hashed_password', None)
-        
-        # Convert enums to their values
-        if 'role' in result:
-            result['role'] = self.role.value if self.role else None
-        if 'status' in result:
-            result['status'] = self.status.value if self.status else None
-            
         # Add full name
         result['full_name'] = self.full_name
         
         return result
+
+# Name and email joined into one string, so a user search is a single ILIKE
+# instead of one per column. On PostgreSQL a pg_trgm GIN index on the same
+# expression serves the leading-wildcard match.
+USER_SEARCH_TEXT = (
+    User.__table__.c.first_name + ' '
+    + User.__table__.c.last_name + ' '
+    + User.__table__.c.email
+)
+
+Index(
+    'ix_users_search_trgm',
+    USER_SEARCH_TEXT.label('search_text'),
+    postgresql_using='gin',
+    postgresql_ops={'search_text': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+
+# users is created before leads, so it can't rely on the leads table's hook
+event.listen(
+    User.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
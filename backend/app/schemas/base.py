@@ -3,24 +3,18 @@ Base Pydantic schemas for the Tesla CRM application.
 """
 from datetime import datetime
 from typing import Optional, Generic, TypeVar, Any
-from pydantic import BaseModel, Field
-from pydantic.generics import GenericModel
+from pydantic import BaseModel, ConfigDict, Field
 
 # Generic type for pagination responses
 DataT = TypeVar('DataT')
 
-class BaseResponse(GenericModel, Generic[DataT]):
+class BaseResponse(BaseModel, Generic[DataT]):
     """Base response model with success flag and optional message."""
     success: bool = True
     message: Optional[str] = None
     data: Optional[DataT] = None
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat() if v else None
-        }
-        orm_mode = True
-        arbitrary_types_allowed = True
+    model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
 
 class BaseSchema(BaseModel):
     """Base schema with common fields."""
@@ -28,8 +22,4 @@ class BaseSchema(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat() if v else None
-        }
+    model_config = ConfigDict(from_attributes=True)
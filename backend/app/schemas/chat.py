@@ -3,7 +3,7 @@ Chat-related Pydantic schemas for the Tesla CRM application.
 """
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from .base import BaseSchema
 
 class MessageBase(BaseModel):
@@ -32,9 +32,14 @@ class Message(MessageBase, BaseSchema):
     """Complete message schema including database fields."""
     conversation_id: Optional[int] = None
     is_read: bool = False
+    # The ORM attribute is ``metadata_`` (``metadata`` is reserved by SQLAlchemy)
+    metadata: Optional[Dict[str, Any]] = Field(
+        None,
+        validation_alias=AliasChoices("metadata_", "metadata"),
+        description="Additional metadata for the message"
+    )
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ConversationBase(BaseModel):
     """Base conversation schema."""
@@ -68,9 +73,14 @@ class Conversation(ConversationBase, BaseSchema):
     """Complete conversation schema including related messages."""
     lead_id: Optional[int] = None
     messages: List[Message] = []
+    # The ORM attribute is ``metadata_`` (``metadata`` is reserved by SQLAlchemy)
+    metadata: Optional[Dict[str, Any]] = Field(
+        None,
+        validation_alias=AliasChoices("metadata_", "metadata"),
+        description="Additional metadata for the conversation"
+    )
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ChatResponse(BaseModel):
     """Response schema for chat interactions."""
@@ -3,17 +3,17 @@ Pydantic models for dashboard-related schemas.
 """
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class ActivityLogBase(BaseModel):
     """Base schema for activity log entries."""
     id: int
     action: str
     created_at: datetime
-    user_id: int
+    user_id: Optional[int] = None
+    user_name: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DashboardStats(BaseModel):
     """Schema for dashboard statistics."""
@@ -23,5 +23,4 @@ class DashboardStats(BaseModel):
     conversion_rate: float
     recent_activities: List[ActivityLogBase]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,12 +1,16 @@
 """
 Lead-related Pydantic schemas for the Tesla CRM application.
 """
+import re
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from enum import Enum
-from pydantic import BaseModel, Field, EmailStr, validator
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, EmailStr, validator
 from .base import BaseSchema
 
+# Strips everything but digits from phone numbers
+_NON_DIGIT_RE = re.compile(r"\D+")
+
 class LeadStatus(str, Enum):
     """Possible statuses for a lead."""
     NEW = "new"
@@ -51,7 +55,7 @@ class LeadBase(BaseModel):
         if v is None:
             return v
         # Simple validation - can be enhanced with a proper phone number library
-        v = ''.join(filter(str.isdigit, v))
+        v = _NON_DIGIT_RE.sub('', v)
         if len(v) < 10:
             raise ValueError("Phone number must be at least 10 digits")
         return v
@@ -76,17 +80,38 @@ class LeadUpdate(BaseModel):
 
 class Lead(LeadBase, BaseSchema):
     """Complete lead schema with all fields."""
-    class Config:
-        orm_mode = True
-        use_enum_values = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat() if v else None
-        }
+    # The ORM attribute is ``metadata_`` (``metadata`` is reserved by SQLAlchemy)
+    metadata: Optional[Dict[str, Any]] = Field(
+        None,
+        validation_alias=AliasChoices("metadata_", "metadata"),
+        description="Additional metadata for the lead"
+    )
+
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
+
+class LeadSummary(BaseModel):
+    """The lead fields shown in list views (no notes, metadata or job title)."""
+    id: int
+    first_name: str
+    last_name: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    company: Optional[str] = None
+    status: LeadStatus
+    source: LeadSource
+    assigned_to: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
 
 class LeadListResponse(BaseModel):
     """Response schema for listing leads with pagination."""
-    items: List[Lead] = []
-    total: int = 0
+    items: List[LeadSummary] = []
+    # Only counted on request (include_total), as counting every match is
+    # the expensive part of a list query
+    total: Optional[int] = None
     page: int = 1
     size: int = 10
-    pages: int = 1
+    pages: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
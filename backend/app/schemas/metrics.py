@@ -4,7 +4,7 @@ Metrics and analytics schemas for the Tesla CRM application.
 from datetime import datetime, date
 from typing import Dict, List, Optional, Any
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class TimeRange(str, Enum):
     """Time range options for metrics."""
@@ -42,6 +42,8 @@ class TimeSeriesPoint(BaseModel):
     date: date
     value: float
     label: Optional[str] = None
+    
+    model_config = ConfigDict(frozen=True)
 
 class TimeSeriesData(BaseModel):
     """Time series data for metrics."""
@@ -63,6 +65,8 @@ class MetricValue(BaseModel):
         None,
         description="Trend indicator (up, down, neutral)"
     )
+    
+    model_config = ConfigDict(frozen=True)
 
 class DashboardMetrics(BaseModel):
     """Complete set of metrics for the dashboard."""
@@ -97,8 +101,4 @@ class ActivityLog(BaseModel):
     details: Optional[Dict[str, Any]] = None
     created_at: datetime
 
-    class Config:
-        orm_mode = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat() if v else None
-        }
+    model_config = ConfigDict(from_attributes=True)
@@ -20,6 +20,8 @@ rows = [
 ]
 
 con = sqlite3.connect(str(DB))
+con.execute("PRAGMA journal_mode=WAL")
+con.execute("PRAGMA synchronous=NORMAL")
 cur = con.cursor()
 cur.execute("""CREATE TABLE IF NOT EXISTS kb_articles (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,12 +30,9 @@ cur.execute("""CREATE TABLE IF NOT EXISTS kb_articles (
     body TEXT,
     tags TEXT
 )""")
-for slug, title, body, tags in rows:
-    try:
-        cur.execute("INSERT INTO kb_articles(slug,title,body,tags) VALUES(?,?,?,?)",
-                    (slug, title, body, tags))
-    except sqlite3.IntegrityError:
-        pass
+# Una sola transacción; los slugs repetidos se ignoran en SQLite
+cur.execute("BEGIN")
+cur.executemany("INSERT OR IGNORE INTO kb_articles(slug,title,body,tags) VALUES(?,?,?,?)", rows)
 con.commit()
 con.close()
 print("KB cargada ✔")
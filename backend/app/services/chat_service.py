@@ -1,9 +1,9 @@
 """
 Chat service for handling chat-related business logic.
 """
-from datetime import datetime
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
 
 from app.models import Conversation, Message, Lead
 from app.schemas.chat import (
@@ -33,7 +33,6 @@ class ChatService:
         
         db.add(db_conversation)
         db.commit()
-        db.refresh(db_conversation)
         return db_conversation
     
     @staticmethod
@@ -47,21 +46,30 @@ class ChatService:
     @staticmethod
     async def get_conversations(
         db: Session,
-        skip: int = 0,
+        after_id: Optional[int] = None,
         limit: int = 100,
         lead_id: Optional[int] = None,
         status: Optional[str] = None,
     ) -> List[Conversation]:
-        """Get a list of conversations with optional filtering."""
-        query = db.query(Conversation)
+        """
+        Get a page of conversations with optional filtering.
+        Pages are keyed on the id: pass the last id of the previous page as
+        ``after_id`` to get the next one.
+        """
+        # The response includes each conversation's messages; load them for
+        # the whole page with one IN (...) query instead of one per row
+        stmt = select(Conversation).options(selectinload(Conversation.messages))
         
         if lead_id is not None:
-            query = query.filter(Conversation.lead_id == lead_id)
+            stmt = stmt.where(Conversation.lead_id == lead_id)
         
         if status:
-            query = query.filter(Conversation.status == status)
+            stmt = stmt.where(Conversation.status == status)
+        
+        if after_id is not None:
+            stmt = stmt.where(Conversation.id > after_id)
         
-        return query.offset(skip).limit(limit).all()
+        return db.scalars(stmt.order_by(Conversation.id).limit(limit)).all()
     
     @staticmethod
     async def update_conversation(
@@ -80,7 +88,6 @@ class ChatService:
         
         db.add(db_conversation)
         db.commit()
-        db.refresh(db_conversation)
         return db_conversation
     
     @staticmethod
@@ -89,41 +96,36 @@ class ChatService:
         message_in: MessageCreate,
     ) -> Message:
         """Create a new message in a conversation."""
-        # Verify the conversation exists
-        conversation = db.query(Conversation).filter(
+        # Bump the conversation's updated_at with a single server-side UPDATE;
+        # no matched row means the conversation doesn't exist
+        updated = db.query(Conversation).filter(
             Conversation.id == message_in.conversation_id
-        ).first()
+        ).update({Conversation.updated_at: func.now()}, synchronize_session=False)
         
-        if not conversation:
+        if not updated:
             raise ValueError("Conversation not found")
         
         db_message = Message(**message_in.dict())
         db.add(db_message)
-        
-        # Update conversation's updated_at timestamp
-        conversation.updated_at = datetime.utcnow()
-        db.add(conversation)
-        
         db.commit()
-        db.refresh(db_message)
         return db_message
     
     @staticmethod
     async def get_messages(
         db: Session,
         conversation_id: int,
-        skip: int = 0,
+        after_id: Optional[int] = None,
         limit: int = 100,
     ) -> List[Message]:
-        """Get messages in a conversation."""
-        return (
-            db.query(Message)
-            .filter(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at.asc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        """
+        Get a page of messages in a conversation, oldest first.
+        Pass the last message id of the previous page as ``after_id`` to get
+        the next one; each page is a range scan on (conversation_id, id).
+        """
+        stmt = select(Message).where(Message.conversation_id == conversation_id)
+        if after_id is not None:
+            stmt = stmt.where(Message.id > after_id)
+        return db.scalars(stmt.order_by(Message.id).limit(limit)).all()
     
     @staticmethod
     async def process_message(
@@ -140,11 +142,11 @@ class ChatService:
         
         # Create or get conversation
         if not message_in.conversation_id:
-            # Create a new conversation if no conversation_id is provided
+            # Create a new conversation if no conversation_id is provided;
+            # flush only assigns its id, everything commits together below
             conversation = Conversation()
             db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
+            db.flush()
             message_in.conversation_id = conversation.id
         else:
             # Verify the conversation exists
@@ -153,27 +155,30 @@ class ChatService:
             )
             if not conversation:
                 raise ValueError("Conversation not found")
+            # One server-side timestamp bump for the whole chat turn
+            conversation.updated_at = func.now()
         
-        # Save the user's message
-        user_message = await ChatService.create_message(db, message_in)
+        # The user's message and the AI's reply are written in one transaction
+        user_message = Message(**message_in.dict())
+        new_messages = [user_message]
         
         # Generate response
+        saved_ai_message = None
         if use_ai:
             chatbot = RuleBasedChatbot()
             ai_response = chatbot.generate_response(message_in.content)
             
-            # Save the AI's response
             ai_message = MessageCreate(
                 content=ai_response,
                 sender="assistant",
                 conversation_id=conversation.id,
                 message_type="text"
             )
-            
-            saved_ai_message = await ChatService.create_message(db, ai_message)
-        else:
-            ai_response = "AI responses are currently disabled."
-            saved_ai_message = None
+            saved_ai_message = Message(**ai_message.dict())
+            new_messages.append(saved_ai_message)
+        
+        db.add_all(new_messages)
+        db.commit()
         
         # Get suggested responses
         suggested_responses = await ChatService.get_suggested_responses(
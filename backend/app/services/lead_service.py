@@ -1,24 +1,130 @@
 """
 Lead service for handling lead-related business logic.
 """
-from datetime import datetime, date
+import os
+import threading
+from datetime import date
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from cachetools import TTLCache
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy import Boolean, any_, bindparam, case, delete, desc, func, literal_column, select, update, and_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from app.models import Lead, User, ActivityLog
+from app.models import Lead, User, ActivityLog, Conversation, Message
+from app.models.lead import LEAD_SEARCH_TEXT
 from app.schemas.lead import LeadCreate, LeadUpdate, LeadStatus, LeadSource
 from app.core.security import get_password_hash
+from app.utils.pagination import before_cursor, encode_cursor
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE, used for the lead upsert
+_UPSERT_INSERTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
+# Lead schema field -> model attribute, computed once; the schemas' ``metadata``
+# is the model's ``metadata_`` (``metadata`` is reserved by SQLAlchemy)
+_LEAD_FIELD_ATTRS = {
+    field: "metadata_" if field == "metadata" else field
+    for field in {**LeadCreate.model_fields, **LeadUpdate.model_fields}
+}
+
+def _lead_attrs(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map dumped lead schema fields onto model attribute names."""
+    return {
+        _LEAD_FIELD_ATTRS[field]: value for field, value in data.items()
+        # A null metadata means "no metadata": keep the column default
+        if not (field == "metadata" and value is None)
+    }
+
+# Columns a lead list page needs (see LeadSummary); notes, metadata and the
+# rest are left unloaded
+_LEAD_LIST_COLUMNS = (
+    Lead.id, Lead.first_name, Lead.last_name, Lead.email, Lead.phone,
+    Lead.company, Lead.status, Lead.source, Lead.assigned_to, Lead.created_at,
+)
+
+# Seconds the source/status breakdowns are served from memory (0 disables).
+# Each is a GROUP BY over the whole leads table; any lead write clears them.
+LEAD_STATS_CACHE_TTL = int(os.getenv("LEAD_STATS_CACHE_TTL", 30))
+
+_stats_cache: TTLCache = TTLCache(maxsize=256, ttl=max(LEAD_STATS_CACHE_TTL, 1))
+# Only held around gets, sets and clears, never while a query runs, so a lead
+# write never waits on an unrelated stats query
+_stats_cache_lock = threading.Lock()
+# Key -> lock held while that key is being computed, so concurrent misses for
+# the same key run the query once while other keys go ahead
+_stats_inflight: Dict[tuple, threading.Lock] = {}
+# Bumped on every clear; stats computed across a write aren't cached
+_stats_generation = 0
+
+def _in_filter(db: Session, column, values: List[Any]):
+    """
+    ``column IN (values)``. On PostgreSQL the list goes out as a single array
+    parameter (``= ANY(:param)``), so the statement text and its plan don't
+    change with the list length; other dialects expand one parameter per value.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return column == any_(
+            bindparam(f"{column.key}_values", list(values), type_=ARRAY(column.type))
+        )
+    return column.in_(values)
+
+def _cached_stats(key: tuple, compute) -> List[Dict[str, Any]]:
+    """Return the stats cached under ``key``, computing them on a miss."""
+    if LEAD_STATS_CACHE_TTL <= 0:
+        return compute()
+    
+    with _stats_cache_lock:
+        stats = _stats_cache.get(key)
+        if stats is not None:
+            return stats
+        key_lock = _stats_inflight.setdefault(key, threading.Lock())
+    
+    # Concurrent misses for this key wait here and then hit the fresh entry
+    with key_lock:
+        with _stats_cache_lock:
+            stats = _stats_cache.get(key)
+            generation = _stats_generation
+        if stats is None:
+            try:
+                stats = compute()
+                with _stats_cache_lock:
+                    if generation == _stats_generation:
+                        _stats_cache[key] = stats
+            finally:
+                with _stats_cache_lock:
+                    _stats_inflight.pop(key, None)
+    return stats
+
+def _invalidate_lead_stats() -> None:
+    """Drop the cached stats after a lead write."""
+    global _stats_generation
+    with _stats_cache_lock:
+        _stats_cache.clear()
+        _stats_generation += 1
 
 class LeadService:
-    """Service class for lead-related operations."""
+    """
+    Service class for lead-related operations.
+    
+    The methods are synchronous, like the ``Session`` they run on; the lead
+    endpoints are plain ``def`` so FastAPI calls them in its threadpool and
+    concurrent requests overlap on the database instead of on the event loop.
+    """
     
     @staticmethod
-    async def create_lead(
+    def create_lead(
         db: Session, 
         lead_in: LeadCreate
     ) -> Lead:
-        """Create a new lead."""
+        """Create a new lead, or update the existing one with the same email."""
+        upsert_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if lead_in.email and upsert_insert is not None:
+            return LeadService._upsert_lead(db, lead_in, upsert_insert)
+        
         # Check if lead with this email already exists
         if lead_in.email:
             existing_lead = db.query(Lead).filter(
@@ -27,106 +133,237 @@ class LeadService:
             
             if existing_lead:
                 # Update existing lead instead of creating a new one
-                update_data = lead_in.dict(exclude_unset=True)
-                for field, value in update_data.items():
-                    setattr(existing_lead, field, value)
+                update_data = lead_in.model_dump(exclude_unset=True)
+                for attr, value in _lead_attrs(update_data).items():
+                    setattr(existing_lead, attr, value)
                 
-                db.add(existing_lead)
-                db.commit()
-                db.refresh(existing_lead)
-                
-                # Log the update
-                await ActivityLog.log_activity(
+                # Log the update in the same transaction
+                ActivityLog.log_activity(
                     db,
                     action="lead.updated",
                     entity_type="lead",
                     entity_id=existing_lead.id,
                     details={"source": "lead_creation", "updated_fields": list(update_data.keys())}
                 )
+                db.commit()
+                _invalidate_lead_stats()
                 
                 return existing_lead
         
         # Create new lead
-        db_lead = Lead(**lead_in.dict())
+        db_lead = Lead(**_lead_attrs(lead_in.model_dump()))
         db.add(db_lead)
-        db.commit()
-        db.refresh(db_lead)
+        # Assigns the id for the activity log; both rows commit together
+        db.flush()
         
         # Log the creation
-        await ActivityLog.log_activity(
+        ActivityLog.log_activity(
             db,
             action="lead.created",
             entity_type="lead",
             entity_id=db_lead.id,
             details={"source": lead_in.source or LeadSource.WEBSITE}
         )
+        db.commit()
+        _invalidate_lead_stats()
         
         return db_lead
     
     @staticmethod
-    async def get_lead(
+    def _upsert_lead(db: Session, lead_in: LeadCreate, upsert_insert) -> Lead:
+        """
+        Insert the lead or update the one with the same email atomically,
+        instead of a SELECT followed by an INSERT or UPDATE that can race on
+        the unique email.
+        
+        On PostgreSQL this is a single INSERT ... ON CONFLICT (email) DO
+        UPDATE ... RETURNING; on SQLite an INSERT ... ON CONFLICT DO NOTHING
+        followed, if the email was taken, by an UPDATE.
+        """
+        # VALUES takes attribute names (metadata_), SET takes column names
+        # (metadata); a None metadata is left out so the column default applies
+        values = _lead_attrs(lead_in.model_dump(exclude_none=True))
+        update_data = lead_in.model_dump(exclude_unset=True)
+        set_ = {
+            **{
+                field: value for field, value in update_data.items()
+                if field != "email" and not (field == "metadata" and value is None)
+            },
+            "updated_at": func.now(),
+        }
+        options = {"populate_existing": True}
+        
+        if db.get_bind().dialect.name == "postgresql":
+            # xmax is 0 only on a row version this statement inserted; the
+            # conflict branch's new version carries the updating transaction
+            stmt = (
+                upsert_insert(Lead)
+                .values(**values)
+                .on_conflict_do_update(index_elements=[Lead.email], set_=set_)
+                .returning(Lead, literal_column("xmax = 0", Boolean).label("inserted"))
+            )
+            db_lead, inserted = db.execute(stmt, execution_options=options).one()
+        else:
+            # SQLite can't tell the two branches apart in RETURNING. The
+            # INSERT takes the database's write lock, so no other writer can
+            # remove the existing lead before the UPDATE.
+            db_lead = db.execute(
+                upsert_insert(Lead)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=[Lead.email])
+                .returning(Lead),
+                execution_options=options,
+            ).scalar_one_or_none()
+            inserted = db_lead is not None
+            if not inserted:
+                db_lead = db.execute(
+                    update(Lead)
+                    .where(Lead.email == lead_in.email)
+                    .values({Lead.__table__.c[key]: value for key, value in set_.items()})
+                    .returning(Lead),
+                    execution_options=options,
+                ).scalar_one()
+        
+        # The activity log commits with the upsert
+        if inserted:
+            ActivityLog.log_activity(
+                db,
+                action="lead.created",
+                entity_type="lead",
+                entity_id=db_lead.id,
+                details={"source": lead_in.source or LeadSource.WEBSITE}
+            )
+        else:
+            ActivityLog.log_activity(
+                db,
+                action="lead.updated",
+                entity_type="lead",
+                entity_id=db_lead.id,
+                details={"source": "lead_creation", "updated_fields": list(update_data.keys())}
+            )
+        db.commit()
+        _invalidate_lead_stats()
+        
+        return db_lead
+    
+    @staticmethod
+    def get_lead(
         db: Session, 
         lead_id: int
     ) -> Optional[Lead]:
         """Get a lead by ID."""
-        return db.query(Lead).filter(Lead.id == lead_id).first()
+        return db.get(Lead, lead_id)
     
     @staticmethod
-    async def get_lead_by_email(
+    def get_lead_by_email(
         db: Session, 
         email: str
     ) -> Optional[Lead]:
         """Get a lead by email."""
-        return db.query(Lead).filter(Lead.email == email).first()
+        return db.scalars(select(Lead).where(Lead.email == email)).first()
     
     @staticmethod
-    async def get_leads(
+    def get_leads(
         db: Session,
         skip: int = 0,
         limit: int = 100,
-        status: Optional[LeadStatus] = None,
-        source: Optional[LeadSource] = None,
-        assigned_to: Optional[int] = None,
+        status: Optional[List[LeadStatus]] = None,
+        source: Optional[List[LeadSource]] = None,
+        assigned_to: Optional[List[int]] = None,
         search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        with_assigned_user: bool = False,
+        with_total: bool = False,
     ) -> Dict[str, Any]:
         """
         Get a list of leads with optional filtering and search.
         
-        Returns a dictionary with 'items' (list of leads) and 'total' (total count).
+        ``status``, ``source`` and ``assigned_to`` are multi-select: a lead
+        matches when its value is any of the given ones.
+        
+        Leads come newest first (created_at, then id, descending), the order
+        the (filter column, created_at) indexes are built for. Pages are
+        either OFFSET-based (``skip``) or keyset-based: pass the
+        ``next_cursor`` of the previous page as ``cursor`` to seek straight
+        past it, so deep pages cost the same as the first one. The cursor
+        holds the last lead's (created_at, id), so it stays valid even if
+        that lead is deleted; a malformed one raises ValueError.
+        
+        One row past the page is fetched to tell whether another page
+        follows, so the database stops there instead of counting every match.
+        Pass ``with_total`` for an exact count (COUNT(*) OVER () in the same
+        query); with a cursor it counts the matching leads from the cursor on.
+        
+        Set ``with_assigned_user`` when the caller reads ``lead.assigned_user``:
+        the users of the whole page are then loaded with one IN (...) query
+        instead of one lazy load per lead. The list endpoint only returns
+        ``assigned_to``, so it leaves this off.
+        
+        Only the LeadSummary columns are loaded; other attributes load
+        lazily, one query per lead, if a caller touches them.
+        
+        Returns a dictionary with 'items' (list of leads), 'has_more', 'total'
+        (None unless ``with_total``) and 'next_cursor' (to pass as
+        ``cursor``, None on the last page).
         """
-        query = db.query(Lead)
+        query = db.query(Lead).options(load_only(*_LEAD_LIST_COLUMNS))
+        if with_assigned_user:
+            query = query.options(selectinload(Lead.assigned_user))
         
         # Apply filters
         if status:
-            query = query.filter(Lead.status == status)
+            query = query.filter(_in_filter(db, Lead.status, status))
         
         if source:
-            query = query.filter(Lead.source == source)
+            query = query.filter(_in_filter(db, Lead.source, source))
         
-        if assigned_to is not None:
-            query = query.filter(Lead.assigned_to == assigned_to)
+        if assigned_to:
+            query = query.filter(_in_filter(db, Lead.assigned_to, assigned_to))
         
         # Apply search
         if search:
-            search_filter = or_(
-                Lead.first_name.ilike(f"%{search}%"),
-                Lead.last_name.ilike(f"%{search}%"),
-                Lead.email.ilike(f"%{search}%"),
-                Lead.phone.ilike(f"%{search}%"),
-                Lead.company.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+            query = query.filter(LEAD_SEARCH_TEXT.ilike(f"%{search}%"))
+        
+        if cursor is not None:
+            # Seek past the cursor's (created_at, id) position
+            query = query.filter(before_cursor(db, Lead.created_at, Lead.id, cursor))
         
-        # Get total count before pagination
-        total = query.count()
+        # The id tie-break keeps pages stable between requests
+        page_query = query.order_by(Lead.created_at.desc(), Lead.id.desc())
         
-        # Apply pagination
-        items = query.offset(skip).limit(limit).all()
+        total = None
+        if with_total:
+            # COUNT(*) OVER () is evaluated before OFFSET/LIMIT, so every row
+            # carries the full count
+            rows = (
+                page_query.add_columns(func.count().over().label("total"))
+                .offset(skip)
+                .limit(limit + 1)
+                .all()
+            )
+            items = [lead for lead, _ in rows]
+            if rows:
+                total = rows[0].total
+            elif skip:
+                # Past the last page there are no rows to read the count from
+                total = query.count()
+            else:
+                total = 0
+        else:
+            items = page_query.offset(skip).limit(limit + 1).all()
         
-        return {"items": items, "total": total}
+        has_more = len(items) > limit
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_more else None
+        return {
+            "items": items,
+            "has_more": has_more,
+            "total": total,
+            "next_cursor": next_cursor,
+        }
     
     @staticmethod
-    async def update_lead(
+    def update_lead(
         db: Session,
         lead_id: int,
         lead_in: LeadUpdate,
@@ -138,80 +375,100 @@ class LeadService:
         
         # Track changes for activity log
         changes = {}
-        update_data = lead_in.dict(exclude_unset=True)
+        update_data = lead_in.model_dump(exclude_unset=True)
         
+        # Only changed attributes are written, so an unchanged field doesn't
+        # end up in the UPDATE
         for field, value in update_data.items():
-            old_value = getattr(db_lead, field)
+            if field == "metadata" and value is None:
+                continue
+            attr = _LEAD_FIELD_ATTRS[field]
+            old_value = getattr(db_lead, attr)
             if old_value != value:
                 changes[field] = {"old": old_value, "new": value}
-            setattr(db_lead, field, value)
+                setattr(db_lead, attr, value)
         
         if changes:
-            db.add(db_lead)
-            db.commit()
-            db.refresh(db_lead)
-            
-            # Log the update
-            await ActivityLog.log_activity(
+            # Log the update in the same transaction
+            ActivityLog.log_activity(
                 db,
                 action="lead.updated",
                 entity_type="lead",
                 entity_id=db_lead.id,
                 details={"changes": changes}
             )
+            db.commit()
+            _invalidate_lead_stats()
         
         return db_lead
     
     @staticmethod
-    async def delete_lead(
+    def delete_lead(
         db: Session,
         lead_id: int,
     ) -> bool:
         """Delete a lead."""
-        db_lead = db.query(Lead).filter(Lead.id == lead_id).first()
-        if not db_lead:
+        # The lead's conversations and their messages go first: SQLite only
+        # applies the foreign keys' ON DELETE CASCADE with PRAGMA foreign_keys
+        conversation_ids = select(Conversation.id).where(Conversation.lead_id == lead_id)
+        db.execute(delete(Message).where(Message.conversation_id.in_(conversation_ids)))
+        db.execute(delete(Conversation).where(Conversation.lead_id == lead_id))
+        
+        # One DELETE ... RETURNING both checks existence and hands back what
+        # the activity log records
+        deleted = db.execute(
+            delete(Lead)
+            .where(Lead.id == lead_id)
+            .returning(Lead.first_name, Lead.last_name, Lead.email, Lead.status)
+        ).one_or_none()
+        if deleted is None:
             return False
         
-        # Log the deletion
-        await ActivityLog.log_activity(
+        # Log the deletion; the log entry commits with the delete
+        ActivityLog.log_activity(
             db,
             action="lead.deleted",
             entity_type="lead",
-            entity_id=db_lead.id,
+            entity_id=lead_id,
             details={
                 "lead_data": {
-                    "name": f"{db_lead.first_name} {db_lead.last_name}",
-                    "email": db_lead.email,
-                    "status": db_lead.status
+                    "name": f"{deleted.first_name} {deleted.last_name}",
+                    "email": deleted.email,
+                    "status": deleted.status
                 }
             }
         )
-        
-        # Delete the lead
-        db.delete(db_lead)
         db.commit()
+        _invalidate_lead_stats()
         return True
     
     @staticmethod
-    async def convert_to_customer(
+    def convert_to_customer(
         db: Session,
         lead_id: int,
     ) -> Lead:
         """Convert a lead to a customer."""
-        db_lead = db.query(Lead).filter(Lead.id == lead_id).first()
-        if not db_lead:
-            raise ValueError("Lead not found")
+        # Update lead status to "won" (or another appropriate status) and get
+        # the row back in the same statement, instead of SELECT then UPDATE.
+        # Leads that are already won don't match, so a repeated conversion
+        # (client or webhook retry) writes and logs nothing.
+        db_lead = db.execute(
+            update(Lead)
+            .where(Lead.id == lead_id, Lead.status != LeadStatus.WON)
+            .values(status=LeadStatus.WON)
+            .returning(Lead),
+            execution_options={"populate_existing": True},
+        ).scalar_one_or_none()
+        if db_lead is None:
+            db_lead = db.get(Lead, lead_id)
+            if db_lead is None:
+                raise ValueError("Lead not found")
+            return db_lead
+        # The database's timestamp for the UPDATE (set through onupdate)
+        db_lead.converted_at = db_lead.updated_at
         
-        # Update lead status to "won" (or another appropriate status)
-        db_lead.status = LeadStatus.WON
-        db_lead.converted_at = datetime.utcnow()
-        
-        db.add(db_lead)
-        db.commit()
-        db.refresh(db_lead)
-        
-        # Log the conversion
-        await ActivityLog.log_activity(
+        # Log the conversion in the same transaction
+        ActivityLog.log_activity(
             db,
             action="lead.converted",
             entity_type="lead",
@@ -221,6 +478,8 @@ class LeadService:
                 "status": db_lead.status
             }
         )
+        db.commit()
+        _invalidate_lead_stats()
         
         # Here you would typically create a new Customer record, send welcome email, etc.
         # For now, we'll just return the updated lead
@@ -228,65 +487,97 @@ class LeadService:
         return db_lead
     
     @staticmethod
-    async def get_lead_source_stats(
+    def get_lead_source_stats(
         db: Session,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
+        limit: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        """Get lead statistics by source."""
-        query = db.query(
+        """
+        Get lead statistics by source, best conversion rate first; ``limit``
+        keeps only the top sources (cached for LEAD_STATS_CACHE_TTL).
+        """
+        return _cached_stats(
+            ("source", start_date, end_date, limit),
+            lambda: LeadService._compute_lead_source_stats(db, start_date, end_date, limit),
+        )
+    
+    @staticmethod
+    def _compute_lead_source_stats(
+        db: Session,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate lead counts and conversions by source.
+        
+        Read-only aggregates run as Core statements on the session's
+        connection, skipping ORM compilation and result processing. The
+        conversion rate is computed, sorted on and limited by the database.
+        """
+        conn = db.connection()
+        converted = func.sum(case((Lead.status == LeadStatus.WON, 1), else_=0))
+        stmt = select(
             Lead.source,
             func.count(Lead.id).label("count"),
-            func.sum(
-                case([(Lead.status == LeadStatus.WON, 1)], else_=0)
-            ).label("converted")
+            converted.label("converted"),
+            func.coalesce(
+                converted * 100.0 / func.nullif(func.count(Lead.id), 0), 0
+            ).label("rate")
         ).group_by(Lead.source)
         
         # Apply date filters if provided
         if start_date:
-            query = query.filter(Lead.created_at >= start_date)
+            stmt = stmt.where(Lead.created_at >= start_date)
         if end_date:
-            query = query.filter(Lead.created_at <= end_date)
+            stmt = stmt.where(Lead.created_at <= end_date)
         
-        results = query.all()
+        stmt = stmt.order_by(desc("rate"), desc("count"))
+        if limit:
+            stmt = stmt.limit(limit)
         
         return [
             {
-                "source": source,
-                "total_leads": count,
-                "converted_leads": converted or 0,
-                "conversion_rate": (converted or 0) / count * 100 if count > 0 else 0
+                "source": row["source"],
+                "total_leads": row["count"],
+                "converted_leads": row["converted"] or 0,
+                "conversion_rate": row["rate"]
             }
-            for source, count, converted in results
+            for row in conn.execute(stmt).mappings()
         ]
     
     @staticmethod
-    async def get_lead_status_stats(
+    def get_lead_status_stats(
         db: Session,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
     ) -> List[Dict[str, Any]]:
-        """Get lead statistics by status."""
-        query = db.query(
+        """Get lead statistics by status (cached for LEAD_STATS_CACHE_TTL)."""
+        return _cached_stats(
+            ("status", start_date, end_date),
+            lambda: LeadService._compute_lead_status_stats(db, start_date, end_date),
+        )
+    
+    @staticmethod
+    def _compute_lead_status_stats(
+        db: Session,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Count leads by status (Core statement, like the source breakdown)."""
+        stmt = select(
             Lead.status,
             func.count(Lead.id).label("count")
         ).group_by(Lead.status)
         
         # Apply date filters if provided
         if start_date:
-            query = query.filter(Lead.created_at >= start_date)
+            stmt = stmt.where(Lead.created_at >= start_date)
         if end_date:
-            query = query.filter(Lead.created_at <= end_date)
+            stmt = stmt.where(Lead.created_at <= end_date)
         
-        results = query.all()
-        
-        return [
-            {
-                "status": status,
-                "count": count
-            }
-            for status, count in results
-        ]
+        return [dict(row) for row in db.connection().execute(stmt).mappings()]
 
 # Create a singleton instance
 lead_service = LeadService()
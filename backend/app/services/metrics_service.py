@@ -1,17 +1,245 @@
 """
 Metrics service for handling analytics and reporting.
 """
+import asyncio
+import os
+import threading
+from functools import lru_cache
 from datetime import date, datetime, timedelta
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, case, extract
+from typing import Any, Callable, Dict, List, Optional
+from cachetools import TTLCache
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import Date, Integer, bindparam, func, and_, or_, case, cast, extract, literal, select, text
+from sqlalchemy.pool import StaticPool
 
-from app.models import Lead, User, ActivityLog, Conversation, Message
+from app.database import engine, readonly_session
+from app.utils.pagination import before_cursor
+from app.models import Lead, User, ActivityLog, Conversation, Message, user_leaderboard
+from app.models.leaderboard import REFRESH_LEADERBOARD_VIEW
 from app.schemas.metrics import (
-    DashboardMetrics, TimeRange, MetricType,
-    TimeSeriesData, TimeSeriesPoint, MetricValue, MetricFilter
+    TimeRange, MetricType,
+    TimeSeriesData, TimeSeriesPoint, MetricFilter
 )
 
+# Estimated value of a won lead; deal values are not stored per lead
+AVERAGE_DEAL_VALUE = 1000
+
+# Seconds dashboard metrics and leaderboards are served from memory, keyed by
+# the resolved date range and user. Writes are not tracked; entries simply
+# expire. Set to 0 to disable the cache.
+METRICS_CACHE_TTL = int(os.getenv("METRICS_CACHE_TTL", 60))
+
+_metrics_cache: TTLCache = TTLCache(maxsize=1024, ttl=max(METRICS_CACHE_TTL, 1))
+# Only ever held around a get or set on the cache, never while computing, so
+# taking it (also from the event loop) doesn't wait on the database
+_metrics_cache_lock = threading.Lock()
+# Key -> lock held while that key is being computed, so concurrent misses for
+# the same key run the query once while other keys go ahead
+_metrics_inflight: Dict[tuple, threading.Lock] = {}
+
+def _cached_metrics(key: tuple, compute):
+    """Return the metrics cached under ``key``, computing them on a miss."""
+    if METRICS_CACHE_TTL <= 0:
+        return compute()
+    
+    with _metrics_cache_lock:
+        metrics = _metrics_cache.get(key)
+        if metrics is not None:
+            return metrics
+        key_lock = _metrics_inflight.setdefault(key, threading.Lock())
+    
+    # Concurrent misses for this key wait here and then hit the fresh entry
+    with key_lock:
+        with _metrics_cache_lock:
+            metrics = _metrics_cache.get(key)
+        if metrics is None:
+            try:
+                metrics = compute()
+                with _metrics_cache_lock:
+                    _metrics_cache[key] = metrics
+            finally:
+                with _metrics_cache_lock:
+                    _metrics_inflight.pop(key, None)
+    return metrics
+
+def _metric(
+    value: float,
+    label: str,
+    description: Optional[str] = None,
+    change_percentage: Optional[float] = None,
+    trend: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    A MetricValue as a plain dict. The dashboard builds a dozen or so per
+    request; they are validated once, against DashboardMetrics, when the
+    response is rendered.
+    """
+    return {
+        "value": value,
+        "label": label,
+        "description": description,
+        "change_percentage": change_percentage,
+        "trend": trend,
+    }
+
+# Columns an activity log listing needs (see schemas.metrics.ActivityLog);
+# the IP address, user agent and user relationship are left unloaded
+_ACTIVITY_LOG_COLUMNS = (
+    ActivityLog.id, ActivityLog.user_id, ActivityLog.action, ActivityLog.entity_type,
+    ActivityLog.entity_id, ActivityLog.details, ActivityLog.created_at,
+)
+
+def _period_window(column, windowed: bool, has_start: bool, has_end: bool):
+    """
+    A ``period`` label ('cur' or 'prev'), the GROUP BY keys for it and the
+    range filters on ``column``, as bound parameters (see _window_params).
+    A windowed range reaches back over the previous period of the same
+    length, so one grouped query returns the rows of both periods;
+    otherwise every row is 'cur' and there is nothing to group on
+    (PostgreSQL rejects a constant in GROUP BY).
+    """
+    conditions = []
+    if has_start:
+        conditions.append(column >= bindparam("lower"))
+    if has_end:
+        conditions.append(column < bindparam("upper"))
+    if not windowed:
+        return literal("cur").label("period"), [], conditions
+    period = case((column >= bindparam("start"), "cur"), else_="prev").label("period")
+    return period, [period], conditions
+
+def _window_params(
+    start_date: Optional[date],
+    end_date: Optional[date],
+    user_id: Optional[int]
+) -> tuple[tuple[bool, bool, bool, bool], Dict[str, Any]]:
+    """
+    The shape of a metrics statement (windowed, has start, has end, by user)
+    and the values for its bound parameters.
+    """
+    lower = start_date
+    windowed = bool(start_date and end_date)
+    if windowed:
+        lower = start_date - timedelta(days=(end_date - start_date).days + 1)
+    params = {
+        "start": start_date,
+        "lower": lower,
+        "upper": end_date + timedelta(days=1) if end_date else None,
+        "user_id": user_id,
+    }
+    shape = (windowed, start_date is not None, end_date is not None, user_id is not None)
+    return shape, params
+
+_ONE_DAY = timedelta(days=1)
+
+def _quarter_start(today: date) -> date:
+    """First day of the quarter ``today`` falls in."""
+    return date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+
+def _last_month(today: date) -> tuple[date, date]:
+    """The whole of the month before ``today``'s."""
+    end = today.replace(day=1) - _ONE_DAY
+    return end.replace(day=1), end
+
+def _last_quarter(today: date) -> tuple[date, date]:
+    """The whole of the quarter before ``today``'s."""
+    end = _quarter_start(today) - _ONE_DAY
+    return date(end.year, end.month - 2, 1), end
+
+# Start and end dates of each relative time range, as seen on a given day
+_RELATIVE_RANGES: Dict[TimeRange, Callable[[date], tuple[date, date]]] = {
+    TimeRange.TODAY: lambda today: (today, today),
+    TimeRange.YESTERDAY: lambda today: (today - _ONE_DAY, today - _ONE_DAY),
+    # Weeks start on Monday
+    TimeRange.THIS_WEEK: lambda today: (today - timedelta(days=today.weekday()), today),
+    TimeRange.LAST_WEEK: lambda today: (
+        today - timedelta(days=today.weekday() + 7),
+        today - timedelta(days=today.weekday() + 1),
+    ),
+    TimeRange.THIS_MONTH: lambda today: (today.replace(day=1), today),
+    TimeRange.LAST_MONTH: _last_month,
+    TimeRange.THIS_QUARTER: lambda today: (_quarter_start(today), today),
+    TimeRange.LAST_QUARTER: _last_quarter,
+    TimeRange.THIS_YEAR: lambda today: (date(today.year, 1, 1), today),
+    TimeRange.LAST_YEAR: lambda today: (date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)),
+}
+
+@lru_cache(maxsize=64)
+def _range_for(time_range: TimeRange, today: date) -> tuple[date, date]:
+    """
+    Start and end dates of a relative time range as seen on ``today``.
+    Pure, so each range is worked out once per day and then shared by every
+    request.
+    """
+    compute = _RELATIVE_RANGES.get(time_range)
+    if compute is None:
+        raise ValueError(f"Unsupported time range: {time_range}")
+    return compute(today)
+
+# The metrics statements below are built once per shape and then only
+# executed with new parameters, so a dashboard load skips rebuilding the
+# expression trees and always hits SQLAlchemy's compiled-SQL cache
+
+@lru_cache(maxsize=None)
+def _lead_metrics_statement(windowed: bool, has_start: bool, has_end: bool, by_user: bool):
+    """Lead counts per period, status and source."""
+    period, grouping, conditions = _period_window(Lead.created_at, windowed, has_start, has_end)
+    if by_user:
+        conditions.append(Lead.assigned_to == bindparam("user_id"))
+    return (
+        select(period, Lead.status, Lead.source, func.count().label("count"))
+        .where(*conditions)
+        .group_by(*grouping, Lead.status, Lead.source)
+    )
+
+@lru_cache(maxsize=None)
+def _conversion_metrics_statement(windowed: bool, has_start: bool, has_end: bool, by_user: bool):
+    """Total and won lead counts per period."""
+    period, grouping, conditions = _period_window(Lead.created_at, windowed, has_start, has_end)
+    if by_user:
+        conditions.append(Lead.assigned_to == bindparam("user_id"))
+    return (
+        select(
+            period,
+            func.count().label("total"),
+            func.sum(case((Lead.status == "won", 1), else_=0)).label("converted"),
+        )
+        .where(*conditions)
+        .group_by(*grouping)
+    )
+
+@lru_cache(maxsize=None)
+def _activity_metrics_statement(windowed: bool, has_start: bool, has_end: bool, by_user: bool):
+    """
+    Activity totals per period, plus each action counted under the first of
+    email / call / scheduled meeting it mentions.
+    """
+    period, grouping, conditions = _period_window(
+        ActivityLog.created_at, windowed, has_start, has_end
+    )
+    if by_user:
+        conditions.append(ActivityLog.user_id == bindparam("user_id"))
+    is_email = ActivityLog.action.contains("email")
+    is_call = ActivityLog.action.contains("call")
+    is_meeting = and_(
+        ActivityLog.action.contains("meeting"),
+        ActivityLog.action.contains("scheduled"),
+    )
+    return (
+        select(
+            period,
+            func.count().label("total"),
+            func.sum(case((is_email, 1), else_=0)).label("emails"),
+            func.sum(case((is_email, 0), (is_call, 1), else_=0)).label("calls"),
+            func.sum(
+                case((or_(is_email, is_call), 0), (is_meeting, 1), else_=0)
+            ).label("meetings"),
+        )
+        .where(*conditions)
+        .group_by(*grouping)
+    )
+
 class MetricsService:
     """Service class for metrics and analytics operations."""
     
@@ -19,12 +247,14 @@ class MetricsService:
     async def get_dashboard_metrics(
         db: Session,
         filter_params: MetricFilter
-    ) -> DashboardMetrics:
+    ) -> Dict[str, Any]:
         """
         Get a complete set of metrics for the dashboard.
         
         This includes lead counts, conversion rates, activity counts,
-        and time series data for visualization.
+        and time series data for visualization. The result is a plain dict
+        in the DashboardMetrics shape; the endpoint's response_model
+        validates it.
         """
         # Get date range
         start_date, end_date = MetricsService._get_date_range(
@@ -33,33 +263,33 @@ class MetricsService:
             filter_params.end_date
         )
         
-        # Initialize metrics
-        metrics = DashboardMetrics()
-        
-        # Get lead metrics
-        lead_metrics = await MetricsService._get_lead_metrics(
-            db, start_date, end_date, filter_params.user_id
-        )
-        metrics.leads = lead_metrics
-        
-        # Get conversion metrics
-        conversion_metrics = await MetricsService._get_conversion_metrics(
-            db, start_date, end_date, filter_params.user_id
-        )
-        metrics.conversions = conversion_metrics
-        
-        # Get activity metrics
-        activity_metrics = await MetricsService._get_activity_metrics(
-            db, start_date, end_date, filter_params.user_id
+        # Keyed by the resolved dates, so relative ranges roll over with the day
+        key = ("dashboard", start_date, end_date, filter_params.user_id)
+        if METRICS_CACHE_TTL > 0:
+            with _metrics_cache_lock:
+                metrics = _metrics_cache.get(key)
+            if metrics is not None:
+                return metrics
+        
+        # The four groups share nothing, so they run side by side
+        args = (start_date, end_date, filter_params.user_id)
+        leads, conversions, activities, time_series = await asyncio.gather(
+            MetricsService._run_concurrently(db, MetricsService._get_lead_metrics, *args),
+            MetricsService._run_concurrently(db, MetricsService._get_conversion_metrics, *args),
+            MetricsService._run_concurrently(db, MetricsService._get_activity_metrics, *args),
+            MetricsService._run_concurrently(db, MetricsService._get_time_series_data, *args),
         )
-        metrics.activities = activity_metrics
-        
-        # Get time series data
-        time_series = await MetricsService._get_time_series_data(
-            db, start_date, end_date, filter_params.user_id
-        )
-        metrics.time_series = time_series
         
+        metrics = {
+            "leads": leads,
+            "conversions": conversions,
+            "activities": activities,
+            "revenue": {},
+            "time_series": time_series,
+        }
+        if METRICS_CACHE_TTL > 0:
+            with _metrics_cache_lock:
+                _metrics_cache[key] = metrics
         return metrics
     
     @staticmethod
@@ -82,30 +312,24 @@ class MetricsService:
         
         # Get the appropriate data based on metric type
         if metric_type == MetricType.LEAD_COUNT:
-            return await MetricsService._get_lead_time_series(
-                db, start_date, end_date, filter_params.user_id
-            )
+            helper = MetricsService._get_lead_time_series
         elif metric_type == MetricType.CONVERSION_RATE:
-            return await MetricsService._get_conversion_time_series(
-                db, start_date, end_date, filter_params.user_id
-            )
+            helper = MetricsService._get_conversion_time_series
         elif metric_type == MetricType.RESPONSE_TIME:
-            return await MetricsService._get_response_time_series(
-                db, start_date, end_date, filter_params.user_id
-            )
+            helper = MetricsService._get_response_time_series
         elif metric_type == MetricType.ACTIVITY_COUNT:
-            return await MetricsService._get_activity_time_series(
-                db, start_date, end_date, filter_params.user_id
-            )
+            helper = MetricsService._get_activity_time_series
         elif metric_type == MetricType.REVENUE:
-            return await MetricsService._get_revenue_time_series(
-                db, start_date, end_date, filter_params.user_id
-            )
+            helper = MetricsService._get_revenue_time_series
         else:
             raise ValueError(f"Unsupported metric type: {metric_type}")
+        
+        return await run_in_threadpool(
+            helper, db, start_date, end_date, filter_params.user_id
+        )
     
     @staticmethod
-    async def get_activity_logs(
+    def get_activity_logs(
         db: Session,
         skip: int = 0,
         limit: int = 50,
@@ -115,43 +339,53 @@ class MetricsService:
         user_id: Optional[int] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
+        cursor: Optional[str] = None,
     ) -> List[ActivityLog]:
         """
-        Get activity logs with filtering and pagination.
+        Get activity logs with filtering and pagination, newest first.
+        
+        Pass ``encode_cursor(created_at, id)`` of the last log of the previous
+        page as ``cursor`` to seek straight to the next page instead of
+        skipping ``skip`` rows; a malformed cursor raises ValueError.
         """
-        query = db.query(ActivityLog)
+        query = select(ActivityLog).options(load_only(*_ACTIVITY_LOG_COLUMNS))
         
         # Apply filters
         if action:
-            query = query.filter(ActivityLog.action == action)
+            query = query.where(ActivityLog.action == action)
         
         if entity_type:
-            query = query.filter(ActivityLog.entity_type == entity_type)
+            query = query.where(ActivityLog.entity_type == entity_type)
         
         if entity_id is not None:
-            query = query.filter(ActivityLog.entity_id == entity_id)
+            query = query.where(ActivityLog.entity_id == entity_id)
         
         if user_id is not None:
-            query = query.filter(ActivityLog.user_id == user_id)
+            query = query.where(ActivityLog.user_id == user_id)
         
         if start_date:
-            query = query.filter(ActivityLog.created_at >= start_date)
+            query = query.where(ActivityLog.created_at >= start_date)
         
         if end_date:
             # Include the entire end date
             next_day = end_date + timedelta(days=1)
-            query = query.filter(ActivityLog.created_at < next_day)
+            query = query.where(ActivityLog.created_at < next_day)
         
-        # Apply pagination and order
-        return (
-            query.order_by(ActivityLog.created_at.desc())
+        if cursor is not None:
+            # Seek past the cursor's (created_at, id) position
+            query = query.where(
+                before_cursor(db, ActivityLog.created_at, ActivityLog.id, cursor)
+            )
+        
+        # Apply pagination and order (the id tie-break keeps pages stable)
+        return db.scalars(
+            query.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc())
             .offset(skip)
             .limit(limit)
-            .all()
-        )
+        ).all()
     
     @staticmethod
-    async def get_leaderboard(
+    def get_leaderboard(
         db: Session,
         filter_params: MetricFilter,
         limit: int = 10,
@@ -159,7 +393,8 @@ class MetricsService:
         """
         Get leaderboard of top-performing users.
         
-        Returns a ranked list of users based on various metrics.
+        Returns a ranked list of users based on various metrics (cached for
+        METRICS_CACHE_TTL).
         """
         # Get date range
         start_date, end_date = MetricsService._get_date_range(
@@ -168,59 +403,34 @@ class MetricsService:
             filter_params.end_date
         )
         
-        # Base query for user metrics
-        query = (
-            db.query(
-                User.id,
-                User.first_name,
-                User.last_name,
-                User.email,
-                func.count(case([(Lead.id.isnot(None), 1)])).label("lead_count"),
-                func.count(case([(Lead.status == "won", 1)])).label("converted_leads"),
-                func.count(case([(ActivityLog.action == "lead.contacted", 1)])).label("contacts_made"),
-                func.count(case([(ActivityLog.action == "meeting.scheduled", 1)])).label("meetings_scheduled"),
+        return _cached_metrics(
+            ("leaderboard", start_date, end_date, filter_params.user_id, limit),
+            lambda: MetricsService._compute_leaderboard(
+                db, start_date, end_date, filter_params.user_id, limit
             )
-            .outerjoin(Lead, Lead.assigned_to == User.id)
-            .outerjoin(ActivityLog, ActivityLog.user_id == User.id)
-            .group_by(User.id, User.first_name, User.last_name, User.email)
         )
-        
-        # Apply date filters to activities
-        if start_date or end_date:
-            if start_date:
-                query = query.filter(
-                    or_(
-                        Lead.created_at >= start_date,
-                        ActivityLog.created_at >= start_date
-                    )
-                )
-            if end_date:
-                next_day = end_date + timedelta(days=1)
-                query = query.filter(
-                    or_(
-                        Lead.created_at < next_day,
-                        ActivityLog.created_at < next_day
-                    )
-                )
-        
-        # Apply user filter if provided
-        if filter_params.user_id:
-            query = query.filter(User.id == filter_params.user_id)
-        
-        # Order by converted leads (primary) and leads (secondary)
-        results = (
-            query.order_by(
-                func.count(case([(Lead.status == "won", 1)])).desc(),
-                func.count(Lead.id).desc()
+    
+    @staticmethod
+    def _compute_leaderboard(
+        db: Session,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        user_id: Optional[int],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Run the leaderboard aggregation and rank the users."""
+        if db.get_bind().dialect.name == "postgresql":
+            results = MetricsService._leaderboard_view_rows(
+                db, start_date, end_date, user_id, limit
+            )
+        else:
+            results = MetricsService._leaderboard_live_rows(
+                db, start_date, end_date, user_id, limit
             )
-            .limit(limit)
-            .all()
-        )
         
         # Format results
-        leaderboard = []
-        for i, row in enumerate(results, 1):
-            leaderboard.append({
+        return [
+            {
                 "rank": i,
                 "user_id": row.id,
                 "name": f"{row.first_name} {row.last_name}",
@@ -229,120 +439,211 @@ class MetricsService:
                 "converted_leads": row.converted_leads or 0,
                 "conversion_rate": (
                     (row.converted_leads / row.lead_count * 100)
-                    if row.lead_count > 0 else 0
+                    if row.lead_count else 0
                 ),
                 "contacts_made": row.contacts_made or 0,
                 "meetings_scheduled": row.meetings_scheduled or 0,
-            })
-        
-        return leaderboard
-    
-    # Helper methods for getting specific metrics
+            }
+            for i, row in enumerate(results, 1)
+        ]
     
     @staticmethod
-    async def _get_lead_metrics(
+    def _leaderboard_view_rows(
         db: Session,
         start_date: Optional[date],
         end_date: Optional[date],
-        user_id: Optional[int] = None
-    ) -> Dict[str, MetricValue]:
-        """Get lead-related metrics."""
-        query = db.query(Lead)
+        user_id: Optional[int],
+        limit: int
+    ) -> list:
+        """Sum the users' daily counts from the leaderboard view (PostgreSQL)."""
+        view = user_leaderboard.c
+        totals = select(
+            view.user_id,
+            cast(func.sum(view.lead_count), Integer).label("lead_count"),
+            cast(func.sum(view.converted_leads), Integer).label("converted_leads"),
+            cast(func.sum(view.contacts_made), Integer).label("contacts_made"),
+            cast(func.sum(view.meetings_scheduled), Integer).label("meetings_scheduled"),
+        ).group_by(view.user_id)
+        if start_date:
+            totals = totals.where(view.day >= start_date)
+        if end_date:
+            totals = totals.where(view.day <= end_date)
+        totals = totals.subquery()
         
-        # Apply filters
+        lead_count = func.coalesce(totals.c.lead_count, 0)
+        converted_leads = func.coalesce(totals.c.converted_leads, 0)
+        query = (
+            select(
+                User.id,
+                User.first_name,
+                User.last_name,
+                User.email,
+                lead_count.label("lead_count"),
+                converted_leads.label("converted_leads"),
+                func.coalesce(totals.c.contacts_made, 0).label("contacts_made"),
+                func.coalesce(totals.c.meetings_scheduled, 0).label("meetings_scheduled"),
+            )
+            .outerjoin(totals, totals.c.user_id == User.id)
+            .order_by(converted_leads.desc(), lead_count.desc())
+            .limit(limit)
+        )
+        if user_id:
+            query = query.where(User.id == user_id)
+        
+        return db.execute(query).all()
+    
+    @staticmethod
+    def _leaderboard_live_rows(
+        db: Session,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        user_id: Optional[int],
+        limit: int
+    ) -> list:
+        """Aggregate the leaderboard from the users, leads and activity logs."""
+        # Leads and activities are aggregated per user separately and then
+        # joined: joining both tables to users directly would pair every lead
+        # of a user with every activity of theirs and multiply the counts
+        leads = select(
+            Lead.assigned_to.label("user_id"),
+            func.count().label("lead_count"),
+            func.sum(case((Lead.status == "won", 1), else_=0)).label("converted_leads"),
+        ).where(Lead.assigned_to.isnot(None)).group_by(Lead.assigned_to)
+        activities = select(
+            ActivityLog.user_id.label("user_id"),
+            func.sum(
+                case((ActivityLog.action == "lead.contacted", 1), else_=0)
+            ).label("contacts_made"),
+            func.sum(
+                case((ActivityLog.action == "meeting.scheduled", 1), else_=0)
+            ).label("meetings_scheduled"),
+        ).where(
+            ActivityLog.action.in_(("lead.contacted", "meeting.scheduled"))
+        ).group_by(ActivityLog.user_id)
+        
+        # Apply date filters to leads and activities
         if start_date:
-            query = query.filter(Lead.created_at >= start_date)
+            leads = leads.where(Lead.created_at >= start_date)
+            activities = activities.where(ActivityLog.created_at >= start_date)
         if end_date:
             next_day = end_date + timedelta(days=1)
-            query = query.filter(Lead.created_at < next_day)
-        if user_id is not None:
-            query = query.filter(Lead.assigned_to == user_id)
+            leads = leads.where(Lead.created_at < next_day)
+            activities = activities.where(ActivityLog.created_at < next_day)
         
-        # Get total leads
-        total_leads = query.count()
+        leads = leads.subquery()
+        activities = activities.subquery()
         
-        # Get leads by status
-        status_query = query.with_entities(
-            Lead.status,
-            func.count(Lead.id).label("count")
-        ).group_by(Lead.status)
+        lead_count = func.coalesce(leads.c.lead_count, 0)
+        converted_leads = func.coalesce(leads.c.converted_leads, 0)
+        query = (
+            select(
+                User.id,
+                User.first_name,
+                User.last_name,
+                User.email,
+                lead_count.label("lead_count"),
+                converted_leads.label("converted_leads"),
+                func.coalesce(activities.c.contacts_made, 0).label("contacts_made"),
+                func.coalesce(activities.c.meetings_scheduled, 0).label("meetings_scheduled"),
+            )
+            .outerjoin(leads, leads.c.user_id == User.id)
+            .outerjoin(activities, activities.c.user_id == User.id)
+            # Order by converted leads (primary) and leads (secondary)
+            .order_by(converted_leads.desc(), lead_count.desc())
+            .limit(limit)
+        )
         
-        status_counts = {status: count for status, count in status_query.all()}
+        # Apply user filter if provided
+        if user_id:
+            query = query.where(User.id == user_id)
         
-        # Get leads by source
-        source_query = query.with_entities(
-            Lead.source,
-            func.count(Lead.id).label("count")
-        ).group_by(Lead.source)
+        return db.execute(query).all()
+    
+    @staticmethod
+    def refresh_leaderboard_view() -> None:
+        """
+        Recompute the leaderboard view from the current leads and activity
+        logs. Readers keep the previous contents until it completes. No-op
+        outside PostgreSQL, where the leaderboard is aggregated live.
+        """
+        if engine.dialect.name != "postgresql":
+            return
+        with engine.begin() as conn:
+            conn.execute(text(REFRESH_LEADERBOARD_VIEW))
+    
+    # Helper methods for getting specific metrics
+    
+    @staticmethod
+    def _get_lead_metrics(
+        db: Session,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        user_id: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get lead-related metrics."""
+        # One grouped query for both periods; totals, per-status and
+        # per-source counts are pivoted from its rows
+        shape, params = _window_params(start_date, end_date, user_id)
+        rows = db.execute(_lead_metrics_statement(*shape), params).all()
         
-        source_counts = {source: count for source, count in source_query.all()}
+        total_leads = 0
+        prev_count = 0
+        status_counts: Dict[str, int] = {}
+        source_counts: Dict[str, int] = {}
+        for row in rows:
+            if row.period != "cur":
+                prev_count += row.count
+                continue
+            total_leads += row.count
+            status_counts[row.status] = status_counts.get(row.status, 0) + row.count
+            source_counts[row.source] = source_counts.get(row.source, 0) + row.count
         
         # Calculate trend (compare with previous period)
         trend = 0  # Default to 0% change
-        if start_date and end_date:
-            # Calculate previous period
-            period_days = (end_date - start_date).days + 1
-            prev_start_date = start_date - timedelta(days=period_days)
-            prev_end_date = start_date - timedelta(days=1)
-            
-            # Get count for previous period
-            prev_count = db.query(Lead).filter(
-                Lead.created_at >= prev_start_date,
-                Lead.created_at < start_date
-            ).count()
-            
-            # Calculate percentage change
-            if prev_count > 0:
-                trend = ((total_leads - prev_count) / prev_count) * 100
+        if start_date and end_date and prev_count > 0:
+            trend = ((total_leads - prev_count) / prev_count) * 100
+        
+        top_source = max(source_counts, key=source_counts.get) if source_counts else None
         
         return {
-            "total": MetricValue(
+            "total": _metric(
                 value=total_leads,
                 label="Total Leads",
                 change_percentage=trend,
                 trend="up" if trend > 0 else "down" if trend < 0 else "neutral"
             ),
-            "new": MetricValue(
+            "new": _metric(
                 value=status_counts.get("new", 0),
                 label="New Leads",
                 description=f"{status_counts.get('new', 0)} of {total_leads} total leads"
             ),
-            "converted": MetricValue(
+            "converted": _metric(
                 value=status_counts.get("won", 0),
                 label="Converted Leads",
                 description=f"{status_counts.get('won', 0)} of {total_leads} total leads"
             ),
-            "top_source": MetricValue(
-                value=max(source_counts.values()) if source_counts else 0,
-                label=(
-                    f"Top Source: {max(source_counts, key=source_counts.get) if source_counts else 'N/A'}",
-                ),
+            "top_source": _metric(
+                value=source_counts[top_source] if top_source else 0,
+                label=f"Top Source: {top_source.value if top_source else 'N/A'}",
                 description=f"{len(source_counts)} sources total"
             )
         }
     
     @staticmethod
-    async def _get_conversion_metrics(
+    def _get_conversion_metrics(
         db: Session,
         start_date: Optional[date],
         end_date: Optional[date],
         user_id: Optional[int] = None
-    ) -> Dict[str, MetricValue]:
+    ) -> Dict[str, Dict[str, Any]]:
         """Get conversion-related metrics."""
-        query = db.query(Lead)
-        
-        # Apply filters
-        if start_date:
-            query = query.filter(Lead.created_at >= start_date)
-        if end_date:
-            next_day = end_date + timedelta(days=1)
-            query = query.filter(Lead.created_at < next_day)
-        if user_id is not None:
-            query = query.filter(Lead.assigned_to == user_id)
-        
-        # Get total leads and converted leads
-        total_leads = query.count()
-        converted_leads = query.filter(Lead.status == "won").count()
+        # Total and converted leads of both periods in one query
+        shape, params = _window_params(start_date, end_date, user_id)
+        counts = {
+            row.period: (row.total, row.converted or 0)
+            for row in db.execute(_conversion_metrics_statement(*shape), params)
+        }
+        total_leads, converted_leads = counts.get("cur", (0, 0))
         
         # Calculate conversion rate
         conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
@@ -350,22 +651,7 @@ class MetricsService:
         # Calculate trend (compare with previous period)
         trend = 0  # Default to 0% change
         if start_date and end_date and total_leads > 0:
-            # Calculate previous period
-            period_days = (end_date - start_date).days + 1
-            prev_start_date = start_date - timedelta(days=period_days)
-            prev_end_date = start_date - timedelta(days=1)
-            
-            # Get counts for previous period
-            prev_query = db.query(Lead).filter(
-                Lead.created_at >= prev_start_date,
-                Lead.created_at < start_date
-            )
-            
-            if user_id is not None:
-                prev_query = prev_query.filter(Lead.assigned_to == user_id)
-            
-            prev_total = prev_query.count()
-            prev_converted = prev_query.filter(Lead.status == "won").count()
+            prev_total, prev_converted = counts.get("prev", (0, 0))
             prev_rate = (prev_converted / prev_total * 100) if prev_total > 0 else 0
             
             # Calculate percentage change
@@ -373,112 +659,69 @@ class MetricsService:
                 trend = ((conversion_rate - prev_rate) / prev_rate) * 100
         
         return {
-            "rate": MetricValue(
+            "rate": _metric(
                 value=conversion_rate,
                 label="Conversion Rate",
-                format="{:.1f}%",
                 change_percentage=trend,
                 trend="up" if trend > 0 else "down" if trend < 0 else "neutral"
             ),
-            "converted": MetricValue(
+            "converted": _metric(
                 value=converted_leads,
                 label="Converted Leads",
                 description=f"{converted_leads} of {total_leads} total leads"
             ),
-            "value": MetricValue(
-                value=converted_leads * 1000,  # Assuming $1000 average deal value
+            "value": _metric(
+                value=converted_leads * AVERAGE_DEAL_VALUE,
                 label="Total Value",
-                format="${:,.2f}",
                 description="Estimated based on average deal value"
             )
         }
     
     @staticmethod
-    async def _get_activity_metrics(
+    def _get_activity_metrics(
         db: Session,
         start_date: Optional[date],
         end_date: Optional[date],
         user_id: Optional[int] = None
-    ) -> Dict[str, MetricValue]:
+    ) -> Dict[str, Dict[str, Any]]:
         """Get activity-related metrics."""
-        query = db.query(ActivityLog)
-        
-        # Apply filters
-        if start_date:
-            query = query.filter(ActivityLog.created_at >= start_date)
-        if end_date:
-            next_day = end_date + timedelta(days=1)
-            query = query.filter(ActivityLog.created_at < next_day)
-        if user_id is not None:
-            query = query.filter(ActivityLog.user_id == user_id)
-        
-        # Get total activities
-        total_activities = query.count()
-        
-        # Get activities by type
-        activities_by_type = (
-            query.with_entities(
-                ActivityLog.action,
-                func.count(ActivityLog.id).label("count")
-            )
-            .group_by(ActivityLog.action)
-            .all()
-        )
-        
-        # Count different types of activities
-        emails_sent = 0
-        calls_made = 0
-        meetings_scheduled = 0
+        # Totals and email / call / meeting counts of both periods in one query
+        shape, params = _window_params(start_date, end_date, user_id)
+        counts = {
+            row.period: row
+            for row in db.execute(_activity_metrics_statement(*shape), params)
+        }
         
-        for action, count in activities_by_type:
-            if "email" in action:
-                emails_sent += count
-            elif "call" in action:
-                calls_made += count
-            elif "meeting" in action and "scheduled" in action:
-                meetings_scheduled += count
+        current = counts.get("cur")
+        total_activities = current.total if current else 0
+        emails_sent = (current.emails or 0) if current else 0
+        calls_made = (current.calls or 0) if current else 0
+        meetings_scheduled = (current.meetings or 0) if current else 0
         
         # Calculate trend (compare with previous period)
         trend = 0  # Default to 0% change
-        if start_date and end_date and total_activities > 0:
-            # Calculate previous period
-            period_days = (end_date - start_date).days + 1
-            prev_start_date = start_date - timedelta(days=period_days)
-            prev_end_date = start_date - timedelta(days=1)
-            
-            # Get count for previous period
-            prev_query = db.query(ActivityLog).filter(
-                ActivityLog.created_at >= prev_start_date,
-                ActivityLog.created_at < start_date
-            )
-            
-            if user_id is not None:
-                prev_query = prev_query.filter(ActivityLog.user_id == user_id)
-            
-            prev_count = prev_query.count()
-            
-            # Calculate percentage change
-            if prev_count > 0:
-                trend = ((total_activities - prev_count) / prev_count) * 100
+        prev_count = counts["prev"].total if "prev" in counts else 0
+        if start_date and end_date and total_activities > 0 and prev_count > 0:
+            trend = ((total_activities - prev_count) / prev_count) * 100
         
         return {
-            "total": MetricValue(
+            "total": _metric(
                 value=total_activities,
                 label="Total Activities",
                 change_percentage=trend,
                 trend="up" if trend > 0 else "down" if trend < 0 else "neutral"
             ),
-            "emails": MetricValue(
+            "emails": _metric(
                 value=emails_sent,
                 label="Emails Sent",
                 description=f"{emails_sent} of {total_activities} total activities"
             ),
-            "calls": MetricValue(
+            "calls": _metric(
                 value=calls_made,
                 label="Calls Made",
                 description=f"{calls_made} of {total_activities} total activities"
             ),
-            "meetings": MetricValue(
+            "meetings": _metric(
                 value=meetings_scheduled,
                 label="Meetings Scheduled",
                 description=f"{meetings_scheduled} of {total_activities} total activities"
@@ -488,49 +731,51 @@ class MetricsService:
     # Helper methods for time series data
     
     @staticmethod
-    async def _get_lead_time_series(
+    def _get_time_series_data(
+        db: Session,
+        start_date: date,
+        end_date: date,
+        user_id: Optional[int] = None
+    ) -> Dict[str, TimeSeriesData]:
+        """Get the daily lead and activity series shown on the dashboard."""
+        return {
+            "leads": MetricsService._get_lead_time_series(
+                db, start_date, end_date, user_id
+            ),
+            "activities": MetricsService._get_activity_time_series(
+                db, start_date, end_date, user_id
+            ),
+        }
+    
+    @staticmethod
+    def _get_lead_time_series(
         db: Session,
         start_date: date,
         end_date: date,
         user_id: Optional[int] = None
     ) -> TimeSeriesData:
         """Get time series data for lead counts."""
-        # Generate date range
-        date_range = MetricsService._generate_date_range(start_date, end_date)
-        
-        # Build query to get leads by day
-        query = (
-            db.query(
-                func.date(Lead.created_at).label("date"),
-                func.count(Lead.id).label("count")
-            )
-            .filter(Lead.created_at >= start_date)
-            .filter(Lead.created_at < end_date + timedelta(days=1))
-            .group_by(func.date(Lead.created_at))
-        )
-        
+        conditions = [
+            Lead.created_at >= start_date,
+            Lead.created_at < end_date + timedelta(days=1),
+        ]
         if user_id is not None:
-            query = query.filter(Lead.assigned_to == user_id)
+            conditions.append(Lead.assigned_to == user_id)
         
-        # Get results as dictionary for easy lookup
-        results = {row.date: row.count for row in query.all()}
+        rows = MetricsService._daily_series(
+            db, Lead.created_at, [func.count().label("count")],
+            conditions, start_date, end_date
+        )
         
         # Build time series points
-        series = []
-        total = 0
-        
-        for current_date in date_range:
-            count = results.get(current_date, 0)
-            total += count
-            
-            series.append(TimeSeriesPoint(
-                date=current_date,
-                value=count,
-                label=f"{count} leads"
-            ))
+        series = [
+            TimeSeriesPoint(date=current_date, value=count, label=f"{count} leads")
+            for current_date, count in rows
+        ]
+        total = sum(count for _, count in rows)
         
         # Calculate average per day
-        avg_per_day = total / len(date_range) if date_range else 0
+        avg_per_day = total / len(series) if series else 0
         
         return TimeSeriesData(
             series=series,
@@ -540,43 +785,41 @@ class MetricsService:
         )
     
     @staticmethod
-    async def _get_conversion_time_series(
+    def _get_conversion_time_series(
         db: Session,
         start_date: date,
         end_date: date,
         user_id: Optional[int] = None
     ) -> TimeSeriesData:
         """Get time series data for conversion rates."""
-        # This is a simplified version - in a real app, you'd want to calculate
-        # conversion rates over time, which requires tracking when leads were created
-        # and when they were converted.
-        
-        # For now, we'll return a placeholder implementation
-        date_range = MetricsService._generate_date_range(start_date, end_date)
-        
-        # In a real implementation, you would calculate actual conversion rates
-        # This is just a placeholder with random data
-        import random
-        
-        series = []
-        total_conversions = 0
-        total_leads = 0
+        # Leads are bucketed by the day they were created; a lead counts as
+        # converted on that day if it has since been won
+        conditions = [
+            Lead.created_at >= start_date,
+            Lead.created_at < end_date + timedelta(days=1),
+        ]
+        if user_id is not None:
+            conditions.append(Lead.assigned_to == user_id)
+        
+        rows = MetricsService._daily_series(
+            db, Lead.created_at,
+            [
+                func.count().label("leads"),
+                func.sum(case((Lead.status == "won", 1), else_=0)).label("conversions"),
+            ],
+            conditions, start_date, end_date
+        )
         
-        for current_date in date_range:
-            # Simulate some random data
-            leads = random.randint(1, 10)
-            conversions = random.randint(0, leads)
-            
-            total_leads += leads
-            total_conversions += conversions
-            
-            rate = (conversions / leads * 100) if leads > 0 else 0
-            
-            series.append(TimeSeriesPoint(
-                date=current_date,
-                value=rate,
-                label=f"{rate:.1f}% conversion"
-            ))
+        rates = [
+            (current_date, (conversions / leads * 100) if leads else 0)
+            for current_date, leads, conversions in rows
+        ]
+        series = [
+            TimeSeriesPoint(date=current_date, value=rate, label=f"{rate:.1f}% conversion")
+            for current_date, rate in rates
+        ]
+        total_leads = sum(leads for _, leads, _ in rows)
+        total_conversions = sum(conversions for _, _, conversions in rows)
         
         # Calculate overall conversion rate
         overall_rate = (total_conversions / total_leads * 100) if total_leads > 0 else 0
@@ -589,92 +832,46 @@ class MetricsService:
         )
     
     @staticmethod
-    async def _get_response_time_series(
+    def _get_response_time_series(
         db: Session,
         start_date: date,
         end_date: date,
         user_id: Optional[int] = None
     ) -> TimeSeriesData:
         """Get time series data for response times."""
-        # This would track how quickly the team responds to leads over time
-        # For now, we'll return a placeholder implementation
-        
-        date_range = MetricsService._generate_date_range(start_date, end_date)
-        
-        # In a real implementation, you would calculate actual response times
-        # This is just a placeholder with random data
-        import random
-        
-        series = []
-        total_time = 0
-        count = 0
-        
-        for current_date in date_range:
-            # Simulate some random data (response time in hours)
-            response_time = random.uniform(0.5, 24.0)
-            total_time += response_time
-            count += 1
-            
-            series.append(TimeSeriesPoint(
-                date=current_date,
-                value=response_time,
-                label=f"{response_time:.1f} hours"
-            ))
-        
-        # Calculate average response time
-        avg_response_time = total_time / count if count > 0 else 0
-        
-        return TimeSeriesData(
-            series=series,
-            total=total_time,
-            average=avg_response_time,
-            change_percentage=0  # Would need previous period data to calculate
-        )
+        # Response times are not recorded yet (no first-contact timestamp on
+        # leads), so there is nothing to chart until they are
+        return TimeSeriesData(series=[], total=0, average=0, change_percentage=0)
     
     @staticmethod
-    async def _get_activity_time_series(
+    def _get_activity_time_series(
         db: Session,
         start_date: date,
         end_date: date,
         user_id: Optional[int] = None
     ) -> TimeSeriesData:
         """Get time series data for activity counts."""
-        # Generate date range
-        date_range = MetricsService._generate_date_range(start_date, end_date)
-        
-        # Build query to get activities by day
-        query = (
-            db.query(
-                func.date(ActivityLog.created_at).label("date"),
-                func.count(ActivityLog.id).label("count")
-            )
-            .filter(ActivityLog.created_at >= start_date)
-            .filter(ActivityLog.created_at < end_date + timedelta(days=1))
-            .group_by(func.date(ActivityLog.created_at))
-        )
-        
+        conditions = [
+            ActivityLog.created_at >= start_date,
+            ActivityLog.created_at < end_date + timedelta(days=1),
+        ]
         if user_id is not None:
-            query = query.filter(ActivityLog.user_id == user_id)
+            conditions.append(ActivityLog.user_id == user_id)
         
-        # Get results as dictionary for easy lookup
-        results = {row.date: row.count for row in query.all()}
+        rows = MetricsService._daily_series(
+            db, ActivityLog.created_at, [func.count().label("count")],
+            conditions, start_date, end_date
+        )
         
         # Build time series points
-        series = []
-        total = 0
-        
-        for current_date in date_range:
-            count = results.get(current_date, 0)
-            total += count
-            
-            series.append(TimeSeriesPoint(
-                date=current_date,
-                value=count,
-                label=f"{count} activities"
-            ))
+        series = [
+            TimeSeriesPoint(date=current_date, value=count, label=f"{count} activities")
+            for current_date, count in rows
+        ]
+        total = sum(count for _, count in rows)
         
         # Calculate average per day
-        avg_per_day = total / len(date_range) if date_range else 0
+        avg_per_day = total / len(series) if series else 0
         
         return TimeSeriesData(
             series=series,
@@ -684,38 +881,40 @@ class MetricsService:
         )
     
     @staticmethod
-    async def _get_revenue_time_series(
+    def _get_revenue_time_series(
         db: Session,
         start_date: date,
         end_date: date,
         user_id: Optional[int] = None
     ) -> TimeSeriesData:
         """Get time series data for revenue."""
-        # This would track revenue over time
-        # For now, we'll return a placeholder implementation
-        
-        date_range = MetricsService._generate_date_range(start_date, end_date)
-        
-        # In a real implementation, you would query actual revenue data
-        # This is just a placeholder with random data
-        import random
-        
-        series = []
-        total_revenue = 0
+        # Deal values are not stored, so revenue is estimated from the won
+        # leads. Like the conversion series they are bucketed by the day they
+        # were created: leads keep no conversion time, and updated_at would
+        # move a win's revenue to whatever day the lead was last edited
+        conditions = [
+            Lead.status == "won",
+            Lead.created_at >= start_date,
+            Lead.created_at < end_date + timedelta(days=1),
+        ]
+        if user_id is not None:
+            conditions.append(Lead.assigned_to == user_id)
         
-        for current_date in date_range:
-            # Simulate some random revenue data
-            revenue = random.uniform(100, 5000)
-            total_revenue += revenue
-            
-            series.append(TimeSeriesPoint(
-                date=current_date,
-                value=revenue,
-                label=f"${revenue:,.2f}"
-            ))
+        revenues = [
+            (current_date, won * AVERAGE_DEAL_VALUE)
+            for current_date, won in MetricsService._daily_series(
+                db, Lead.created_at, [func.count().label("won")],
+                conditions, start_date, end_date
+            )
+        ]
+        series = [
+            TimeSeriesPoint(date=current_date, value=revenue, label=f"${revenue:,.2f}")
+            for current_date, revenue in revenues
+        ]
+        total_revenue = sum(revenue for _, revenue in revenues)
         
         # Calculate average revenue per day
-        avg_per_day = total_revenue / len(date_range) if date_range else 0
+        avg_per_day = total_revenue / len(series) if series else 0
         
         return TimeSeriesData(
             series=series,
@@ -724,7 +923,23 @@ class MetricsService:
             change_percentage=0  # Would need previous period data to calculate
         )
     
-    # Helper methods
+    @staticmethod
+    async def _run_concurrently(db: Session, helper, *args):
+        """
+        Run a blocking metrics helper in the threadpool on a read-only session
+        of its own, so helpers gathered together hold separate pooled
+        connections and their queries overlap. An in-memory SQLite database
+        has a single shared connection, so there the helper runs inline on
+        the request's session.
+        """
+        if isinstance(engine.pool, StaticPool):
+            return helper(db, *args)
+        
+        def run():
+            with readonly_session() as session:
+                return helper(session, *args)
+        
+        return await run_in_threadpool(run)
     
     @staticmethod
     def _get_date_range(
@@ -733,90 +948,56 @@ class MetricsService:
         custom_end: Optional[date] = None
     ) -> tuple[Optional[date], Optional[date]]:
         """Get start and end dates based on time range."""
-        today = date.today()
-        
-        if time_range == TimeRange.TODAY:
-            return today, today
-        elif time_range == TimeRange.YESTERDAY:
-            yesterday = today - timedelta(days=1)
-            return yesterday, yesterday
-        elif time_range == TimeRange.THIS_WEEK:
-            # Start of week (Monday)
-            start = today - timedelta(days=today.weekday())
-            return start, today
-        elif time_range == TimeRange.LAST_WEEK:
-            # Start of last week (Monday)
-            start = today - timedelta(days=today.weekday() + 7)
-            end = start + timedelta(days=6)
-            return start, end
-        elif time_range == TimeRange.THIS_MONTH:
-            # Start of month
-            start = date(today.year, today.month, 1)
-            return start, today
-        elif time_range == TimeRange.LAST_MONTH:
-            # Start of last month
-            if today.month == 1:
-                start = date(today.year - 1, 12, 1)
-            else:
-                start = date(today.year, today.month - 1, 1)
-            
-            # End of last month
-            if today.month == 1:
-                end = date(today.year - 1, 12, 31)
-            else:
-                # Get the last day of the previous month
-                next_month = date(today.year, today.month, 1)
-                end = next_month - timedelta(days=1)
-            
-            return start, end
-        elif time_range == TimeRange.THIS_QUARTER:
-            # Start of quarter
-            quarter_start_month = 3 * ((today.month - 1) // 3) + 1
-            start = date(today.year, quarter_start_month, 1)
-            return start, today
-        elif time_range == TimeRange.LAST_QUARTER:
-            # Calculate current quarter (1-4)
-            current_quarter = (today.month - 1) // 3 + 1
-            
-            # Get previous quarter and year
-            if current_quarter == 1:
-                prev_quarter = 4
-                prev_year = today.year - 1
-            else:
-                prev_quarter = current_quarter - 1
-                prev_year = today.year
-            
-            # Start month of previous quarter
-            start_month = 3 * (prev_quarter - 1) + 1
-            start = date(prev_year, start_month, 1)
-            
-            # End month of previous quarter
-            end_month = start_month + 2
-            
-            # Handle December (end of year)
-            if end_month == 12:
-                end = date(prev_year, 12, 31)
-            else:
-                # Get the last day of the end month
-                next_month = date(prev_year, end_month + 1, 1)
-                end = next_month - timedelta(days=1)
-            
-            return start, end
-        elif time_range == TimeRange.THIS_YEAR:
-            # Start of year
-            start = date(today.year, 1, 1)
-            return start, today
-        elif time_range == TimeRange.LAST_YEAR:
-            # Last year
-            start = date(today.year - 1, 1, 1)
-            end = date(today.year - 1, 12, 31)
-            return start, end
-        elif time_range == TimeRange.CUSTOM:
+        if time_range == TimeRange.CUSTOM:
             if not custom_start or not custom_end:
                 raise ValueError("start_date and end_date are required for custom range")
             return custom_start, custom_end
-        else:
-            raise ValueError(f"Unsupported time range: {time_range}")
+        return _range_for(time_range, date.today())
+    
+    @staticmethod
+    def _daily_series(
+        db: Session,
+        timestamp,
+        aggregates: list,
+        conditions: list,
+        start_date: date,
+        end_date: date
+    ) -> List[tuple]:
+        """
+        ``(date, *aggregates)`` for every day from start_date to end_date,
+        grouping the rows matching ``conditions`` by the day of ``timestamp``.
+        Days without rows get zeros. On PostgreSQL generate_series supplies
+        the days in the same query; elsewhere the gaps are filled while the
+        grouped rows are read.
+        """
+        day = func.date(timestamp, type_=Date).label("date")
+        grouped = select(day, *aggregates).where(*conditions).group_by(day)
+        
+        if db.get_bind().dialect.name == "postgresql":
+            counts = grouped.subquery()
+            days = func.generate_series(
+                start_date, end_date, text("interval '1 day'")
+            ).table_valued("d").render_derived()
+            series_day = cast(days.c.d, Date)
+            query = (
+                select(
+                    series_day.label("date"),
+                    *(
+                        func.coalesce(counts.c[agg.name], 0).label(agg.name)
+                        for agg in aggregates
+                    )
+                )
+                .select_from(days.outerjoin(counts, counts.c.date == series_day))
+                .order_by(days.c.d)
+            )
+            return [tuple(row) for row in db.execute(query)]
+        
+        rows = {row[0]: tuple(row[1:]) for row in db.execute(grouped)}
+        zeros = (0,) * len(aggregates)
+        return [
+            (current_date, *rows.get(current_date, zeros))
+            for current_date in MetricsService._generate_date_range(start_date, end_date)
+        ]
     
     @staticmethod
     def _generate_date_range(
@@ -824,14 +1005,10 @@ class MetricsService:
         end_date: date
     ) -> List[date]:
         """Generate a list of dates from start_date to end_date (inclusive)."""
-        date_list = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            date_list.append(current_date)
-            current_date += timedelta(days=1)
-        
-        return date_list
+        return [
+            start_date + timedelta(days=offset)
+            for offset in range((end_date - start_date).days + 1)
+        ]
 
 # Create a singleton instance
 metrics_service = MetricsService()
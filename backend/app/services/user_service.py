@@ -1,14 +1,29 @@
 """
 User service for handling user-related business logic.
 """
-from datetime import datetime
 from typing import List, Dict, Any, Optional, Union
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, defer, selectinload
+from sqlalchemy import bindparam, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.models import User, ActivityLog
+from app.models.user import USER_SEARCH_TEXT
 from app.schemas.user import UserCreate, UserUpdate, UserRole, UserStatus
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
+from app.utils.pagination import before_cursor
+
+# Built once: each lookup only binds a new value, and the compiled SQL comes
+# straight from the engine's statement cache
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING, used to create a user only
+# if the email is free
+_INSERTS_IGNORING_CONFLICTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
 
 class UserService:
     """Service class for user-related operations."""
@@ -19,42 +34,54 @@ class UserService:
         user_in: UserCreate
     ) -> User:
         """Create a new user."""
-        # Check if user with this email already exists
-        existing_user = await UserService.get_user_by_email(db, email=user_in.email)
-        if existing_user:
-            raise ValueError("Email already registered")
-        
-        # Hash the password
-        hashed_password = get_password_hash(user_in.password)
-        
-        # Create user object
-        db_user = User(
-            email=user_in.email,
-            hashed_password=hashed_password,
-            first_name=user_in.first_name,
-            last_name=user_in.last_name,
-            role=user_in.role or UserRole.USER,
-            status=UserStatus.ACTIVE,
-            is_superuser=user_in.is_superuser or False,
-        )
+        insert_ignoring = _INSERTS_IGNORING_CONFLICTS.get(db.get_bind().dialect.name)
+        if insert_ignoring is None:
+            # Check if user with this email already exists
+            if await UserService.email_exists(db, email=user_in.email):
+                raise ValueError("Email already registered")
+        
+        # Hash on the bcrypt pool so it doesn't block the loop
+        hashed_password = await get_password_hash_async(user_in.password)
+        
+        values = {
+            "email": user_in.email,
+            "hashed_password": hashed_password,
+            "first_name": user_in.first_name,
+            "last_name": user_in.last_name,
+            "role": user_in.role or UserRole.USER,
+            "status": UserStatus.ACTIVE,
+            "is_superuser": user_in.is_superuser or False,
+        }
         
         # Add optional fields if provided
         if user_in.phone:
-            db_user.phone = user_in.phone
+            values["phone"] = user_in.phone
         
         if user_in.position:
-            db_user.position = user_in.position
+            values["position"] = user_in.position
         
         if user_in.department:
-            db_user.department = user_in.department
-        
-        # Save to database
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+            values["department"] = user_in.department
+        
+        if insert_ignoring is not None:
+            # Insert unless the email is taken, in one atomic statement: no
+            # row back means a concurrent or earlier signup already has it
+            db_user = db.execute(
+                insert_ignoring(User)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User)
+            ).scalar_one_or_none()
+            if db_user is None:
+                raise ValueError("Email already registered")
+        else:
+            # Save to database; the flush assigns the id for the activity log
+            db_user = User(**values)
+            db.add(db_user)
+            db.flush()
         
-        # Log the user creation
-        await ActivityLog.log_activity(
+        # Log the user creation in the same transaction
+        ActivityLog.log_activity(
             db,
             action="user.created",
             entity_type="user",
@@ -62,6 +89,7 @@ class UserService:
             user_id=db_user.id,
             details={"role": db_user.role, "status": db_user.status}
         )
+        db.commit()
         
         return db_user
     
@@ -71,7 +99,7 @@ class UserService:
         user_id: int
     ) -> Optional[User]:
         """Get a user by ID."""
-        return db.query(User).filter(User.id == user_id).first()
+        return db.scalars(_USER_BY_ID, {"user_id": user_id}).first()
     
     @staticmethod
     async def get_user_by_email(
@@ -79,23 +107,36 @@ class UserService:
         email: str
     ) -> Optional[User]:
         """Get a user by email."""
-        return db.query(User).filter(User.email == email).first()
+        return db.scalars(_USER_BY_EMAIL, {"email": email}).first()
+    
+    @staticmethod
+    async def email_exists(
+        db: Session,
+        email: str
+    ) -> bool:
+        """Check whether a user with this email exists without loading the row."""
+        return db.scalar(
+            select(literal(1)).where(User.email == email).limit(1)
+        ) is not None
     
     @staticmethod
     async def get_users(
         db: Session,
-        skip: int = 0,
+        after_id: Optional[int] = None,
         limit: int = 100,
         role: Optional[UserRole] = None,
         status: Optional[UserStatus] = None,
         search: Optional[str] = None,
     ) -> List[User]:
         """
-        Get a list of users with optional filtering.
+        Get a page of users with optional filtering.
+        
+        Pages are keyed on the id: pass the last id of the previous page as
+        ``after_id`` to get the next one.
         
         Args:
             db: Database session
-            skip: Number of records to skip for pagination
+            after_id: ID of the last user of the previous page
             limit: Maximum number of records to return
             role: Filter by user role
             status: Filter by user status
@@ -104,26 +145,26 @@ class UserService:
         Returns:
             List of User objects
         """
-        query = db.query(User)
+        # The password hash is never part of a user listing, so it stays
+        # behind in the database
+        query = select(User).options(defer(User.hashed_password))
         
         # Apply filters
         if role:
-            query = query.filter(User.role == role)
+            query = query.where(User.role == role)
         
         if status:
-            query = query.filter(User.status == status)
+            query = query.where(User.status == status)
         
         # Apply search
         if search:
-            search_filter = or_(
-                User.first_name.ilike(f"%{search}%"),
-                User.last_name.ilike(f"%{search}%"),
-                User.email.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+            query = query.where(USER_SEARCH_TEXT.ilike(f"%{search}%"))
         
-        # Apply pagination
-        return query.offset(skip).limit(limit).all()
+        # Seek past the cursor instead of skipping rows
+        if after_id is not None:
+            query = query.where(User.id > after_id)
+        
+        return db.scalars(query.order_by(User.id).limit(limit)).all()
     
     @staticmethod
     async def update_user(
@@ -144,7 +185,7 @@ class UserService:
         Returns:
             Updated User object if successful, None if user not found
         """
-        db_user = await UserService.get_user(db, user_id)
+        db_user = db.scalars(_USER_BY_ID, {"user_id": user_id}).first()
         if not db_user:
             return None
         
@@ -152,30 +193,28 @@ class UserService:
         if current_user and not current_user.is_superuser and current_user.id != user_id:
             raise PermissionError("Not authorized to update this user")
         
-        # Track changes for activity log
-        changes = {}
-        update_data = user_in.dict(exclude_unset=True)
-        
-        # Update user fields
-        for field, value in update_data.items():
-            # Skip password updates (handled separately)
-            if field == 'password':
-                continue
-                
-            old_value = getattr(db_user, field, None)
-            if old_value != value:
-                changes[field] = {"old": old_value, "new": value}
-                setattr(db_user, field, value)
+        # Track changes for activity log (password updates are handled separately)
+        update_data = user_in.model_dump(exclude_unset=True, exclude={"password"})
+        changes = {
+            field: {"old": old_value, "new": value}
+            for field, value in update_data.items()
+            if (old_value := getattr(db_user, field, None)) != value
+        }
         
         # Only update if there are changes
         if changes:
-            db_user.updated_at = datetime.utcnow()
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
+            # Write just the changed columns and reload the row from RETURNING
+            # (updated_at is set by the column's onupdate)
+            db_user = db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values({field: change["new"] for field, change in changes.items()})
+                .returning(User),
+                execution_options={"populate_existing": True},
+            ).scalar_one()
             
-            # Log the update
-            await ActivityLog.log_activity(
+            # Log the update in the same transaction
+            ActivityLog.log_activity(
                 db,
                 action="user.updated",
                 entity_type="user",
@@ -183,6 +222,7 @@ class UserService:
                 user_id=current_user.id if current_user else None,
                 details={"changes": changes}
             )
+            db.commit()
         
         return db_user
     
@@ -205,30 +245,33 @@ class UserService:
         Returns:
             True if successful, False if user not found
         """
-        db_user = await UserService.get_user(db, user_id)
-        if not db_user:
-            return False
-        
         # Check permissions
         if current_user and not current_user.is_superuser and current_user.id != user_id:
             raise PermissionError("Not authorized to update this user's password")
         
-        # Update password
-        db_user.hashed_password = get_password_hash(new_password)
-        db_user.updated_at = datetime.utcnow()
-        
-        db.add(db_user)
-        db.commit()
+        hashed_password = await get_password_hash_async(new_password)
+        
+        # Update password in one statement; no row back means no such user
+        # (updated_at is set by the column's onupdate)
+        updated_id = db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(hashed_password=hashed_password)
+            .returning(User.id)
+        ).scalar_one_or_none()
+        if updated_id is None:
+            return False
         
-        # Log the password change
-        await ActivityLog.log_activity(
+        # Log the password change in the same transaction
+        ActivityLog.log_activity(
             db,
             action="user.password_updated",
             entity_type="user",
-            entity_id=db_user.id,
+            entity_id=user_id,
             user_id=current_user.id if current_user else None,
             details={"password_changed": True}
         )
+        db.commit()
         
         return True
     
@@ -252,7 +295,7 @@ class UserService:
         Returns:
             True if successful, False if user not found
         """
-        db_user = await UserService.get_user(db, user_id)
+        db_user = db.scalars(_USER_BY_ID, {"user_id": user_id}).first()
         if not db_user:
             return False
         
@@ -264,8 +307,8 @@ class UserService:
         if current_user and current_user.id == user_id and not current_user.is_superuser:
             raise PermissionError("You cannot delete your own account")
         
-        # Log the deletion
-        await ActivityLog.log_activity(
+        # Log the deletion; the entry commits with the delete
+        ActivityLog.log_activity(
             db,
             action="user.deleted",
             entity_type="user",
@@ -306,7 +349,7 @@ class UserService:
         Returns:
             Updated User object if successful, None if user not found
         """
-        db_user = await UserService.get_user(db, user_id)
+        db_user = db.scalars(_USER_BY_ID, {"user_id": user_id}).first()
         if not db_user:
             return None
         
@@ -321,14 +364,11 @@ class UserService:
         # Only update if not already inactive
         if db_user.status != UserStatus.INACTIVE:
             old_status = db_user.status
+            # updated_at is set by the database through the column's onupdate
             db_user.status = UserStatus.INACTIVE
-            db_user.updated_at = datetime.utcnow()
-            
-            db.add(db_user)
-            db.commit()
             
-            # Log the deactivation
-            await ActivityLog.log_activity(
+            # Log the deactivation in the same transaction
+            ActivityLog.log_activity(
                 db,
                 action="user.deactivated",
                 entity_type="user",
@@ -336,6 +376,7 @@ class UserService:
                 user_id=current_user.id if current_user else None,
                 details={"old_status": old_status, "new_status": UserStatus.INACTIVE}
             )
+            db.commit()
         
         return db_user
     
@@ -356,31 +397,33 @@ class UserService:
         Returns:
             Updated User object if successful, None if user not found
         """
-        db_user = await UserService.get_user(db, user_id)
-        if not db_user:
-            return None
-        
         # Check permissions
         if current_user and not current_user.is_superuser and current_user.id != user_id:
             raise PermissionError("Not authorized to activate this user")
         
-        # Only update if currently inactive
-        if db_user.status == UserStatus.INACTIVE:
-            db_user.status = UserStatus.ACTIVE
-            db_user.updated_at = datetime.utcnow()
-            
-            db.add(db_user)
-            db.commit()
-            
-            # Log the activation
-            await ActivityLog.log_activity(
-                db,
-                action="user.activated",
-                entity_type="user",
-                entity_id=db_user.id,
-                user_id=current_user.id if current_user else None,
-                details={"old_status": UserStatus.INACTIVE, "new_status": UserStatus.ACTIVE}
-            )
+        # Activate and get the row back in the same statement. Only an
+        # inactive user matches, so activating an active one (or a repeated
+        # request) writes and logs nothing.
+        db_user = db.execute(
+            update(User)
+            .where(User.id == user_id, User.status == UserStatus.INACTIVE)
+            .values(status=UserStatus.ACTIVE)
+            .returning(User),
+            execution_options={"populate_existing": True},
+        ).scalar_one_or_none()
+        if db_user is None:
+            return db.scalars(_USER_BY_ID, {"user_id": user_id}).first()
+        
+        # Log the activation in the same transaction
+        ActivityLog.log_activity(
+            db,
+            action="user.activated",
+            entity_type="user",
+            entity_id=db_user.id,
+            user_id=current_user.id if current_user else None,
+            details={"old_status": UserStatus.INACTIVE, "new_status": UserStatus.ACTIVE}
+        )
+        db.commit()
         
         return db_user
     
@@ -401,33 +444,44 @@ class UserService:
         Returns:
             User object if authentication is successful, None otherwise
         """
-        user = await UserService.get_user_by_email(db, email=email)
+        user = db.scalars(_USER_BY_EMAIL, {"email": email}).first()
         if not user:
             # User not found
             return None
         
-        if not verify_password(password, user.hashed_password):
-            # Invalid password
+        # Check if user is active before paying for the hash; like an
+        # unknown email, an inactive account can't log in whatever the password
+        if user.status != UserStatus.ACTIVE:
             return None
         
-        # Check if user is active
-        if user.status != UserStatus.ACTIVE:
+        if not await verify_password_async(password, user.hashed_password):
+            # Invalid password
             return None
         
-        # Update last login timestamp
-        user.last_login = datetime.utcnow()
-        db.add(user)
-        db.commit()
+        # Stamp the login with the database clock in one UPDATE of that column
+        # and refresh the user from RETURNING. updated_at is kept: a login
+        # doesn't change the account. No row back means the user was
+        # deactivated or deleted since the check above.
+        user = db.execute(
+            update(User)
+            .where(User.id == user.id, User.status == UserStatus.ACTIVE)
+            .values(last_login_at=func.now(), updated_at=User.updated_at)
+            .returning(User),
+            execution_options={"populate_existing": True},
+        ).scalar_one_or_none()
+        if user is None:
+            return None
         
-        # Log the login
-        await ActivityLog.log_activity(
+        # Log the login in the same transaction
+        ActivityLog.log_activity(
             db,
             action="user.logged_in",
             entity_type="user",
             entity_id=user.id,
             user_id=user.id,
-            details={"login_time": user.last_login.isoformat()}
+            details={"login_time": user.last_login_at.isoformat()}
         )
+        db.commit()
         
         return user
     
@@ -457,26 +511,41 @@ class UserService:
     async def get_user_activities(
         db: Session,
         user_id: int,
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 50,
+        with_user: bool = False,
     ) -> List[ActivityLog]:
         """
-        Get activity logs for a specific user.
+        Get activity logs for a specific user, newest first.
+        
+        Set ``with_user`` when the caller reads ``log.user`` (or
+        ``log.user_name``): the user is then loaded with the page instead of
+        lazily on first access, after the session may be gone.
         
         Args:
             db: Database session
             user_id: ID of the user
-            skip: Number of records to skip for pagination
+            cursor: ``encode_cursor(created_at, id)`` of the last log of the
+                previous page (raises ValueError if malformed)
             limit: Maximum number of records to return
+            with_user: Preload each log's user
             
         Returns:
             List of ActivityLog objects
         """
+        query = db.query(ActivityLog).filter(ActivityLog.user_id == user_id)
+        if with_user:
+            query = query.options(selectinload(ActivityLog.user))
+        
+        if cursor is not None:
+            # Seek past the cursor's (created_at, id) position
+            query = query.filter(
+                before_cursor(db, ActivityLog.created_at, ActivityLog.id, cursor)
+            )
+        
+        # The id tie-break keeps pages stable
         return (
-            db.query(ActivityLog)
-            .filter(ActivityLog.user_id == user_id)
-            .order_by(ActivityLog.created_at.desc())
-            .offset(skip)
+            query.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc())
             .limit(limit)
             .all()
         )
@@ -0,0 +1,42 @@
+"""
+Keyset (seek) pagination over newest-first ``(created_at, id)`` orderings.
+
+The cursor carries the position of the last row of a page itself, so the
+next page doesn't depend on that row still existing.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import bindparam, func, tuple_
+from sqlalchemy.orm import Session
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque, URL-safe cursor for the row at ``(created_at, row_id)``."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def before_cursor(db: Session, created_at_column, id_column, cursor: str):
+    """
+    ``(created_at, id) < cursor position``, the condition for the page after
+    ``cursor`` in newest-first order. Compares the columns themselves, so the
+    (created_at, id) indexes serve the seek.
+    """
+    created_at, row_id = decode_cursor(cursor)
+    position = bindparam(None, created_at, type_=created_at_column.type)
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite keeps CURRENT_TIMESTAMP defaults as 'YYYY-MM-DD HH:MM:SS'
+        # text, while a bound datetime is written with microseconds and would
+        # compare as later; datetime() puts it in the stored form
+        position = func.datetime(position)
+    return tuple_(created_at_column, id_column) < tuple_(position, row_id)
@@ -0,0 +1,34 @@
+"""
+Shared fixtures for the backend tests.
+
+The tests run against a throwaway SQLite file, never the committed
+tesla.db. DATABASE_URL is set here, before any test module imports
+app.database, because the engine is created from it at import time.
+"""
+import os
+import tempfile
+
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="tesla-crm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DB_DIR, 'test.db')}"
+
+import pytest
+
+from app.database import SessionLocal, engine
+# The tables are declared on the models' Base, not on app.database.Base
+from app.models import Base
+from app.services.lead_service import _invalidate_lead_stats
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables, dropped again afterwards."""
+    # Starting an app lifespan creates and seeds the tables too
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        # Cached stats would otherwise leak into the next test's empty tables
+        _invalidate_lead_stats()
@@ -0,0 +1,36 @@
+"""
+The v1 endpoint routers are mounted once, when app.main is imported.
+"""
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+def _v1_routes():
+    return [
+        (route.path, tuple(sorted(route.methods)))
+        for route in app.routes
+        if route.path.startswith("/api/v1/")
+    ]
+
+def test_v1_routes_are_mounted_without_running_the_lifespan():
+    paths = {path for path, _ in _v1_routes()}
+
+    assert "/api/v1/leads/" in paths
+    assert "/api/v1/chat/conversations/" in paths
+    assert "/api/v1/metrics/dashboard" in paths
+    assert "/api/v1/dashboard/stats" in paths
+
+def test_v1_routes_are_mounted_once():
+    routes = _v1_routes()
+
+    assert len(routes) == len(set(routes))
+
+def test_restarting_the_lifespan_does_not_mount_routes_again():
+    before = _v1_routes()
+
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert client.get("/api/v1/dashboard/stats").status_code == 200
+
+    assert _v1_routes() == before
+    assert "/api/v1/dashboard/stats" in client.app.openapi()["paths"]
@@ -0,0 +1,117 @@
+"""
+Lead lookups, the create-or-update upsert and keyset paging of lead lists.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.models import ActivityLog, Lead
+from app.schemas.lead import LeadCreate, LeadUpdate
+from app.services.lead_service import LeadService
+from app.utils.pagination import decode_cursor, encode_cursor
+
+def _new_lead(email=None, **fields):
+    return LeadCreate(
+        first_name=fields.pop("first_name", "Test"),
+        last_name="Lead",
+        email=email,
+        phone="5551234567",
+        **fields,
+    )
+
+def _actions(db, lead_id):
+    return db.scalars(
+        select(ActivityLog.action)
+        .where(ActivityLog.entity_type == "lead", ActivityLog.entity_id == lead_id)
+        .order_by(ActivityLog.id)
+    ).all()
+
+def test_lookups_return_the_current_orm_row(db):
+    lead = LeadService.create_lead(db, _new_lead("a@example.com"))
+
+    LeadService.update_lead(db, lead.id, LeadUpdate(first_name="Renamed"))
+
+    by_id = LeadService.get_lead(db, lead.id)
+    by_email = LeadService.get_lead_by_email(db, "a@example.com")
+    assert isinstance(by_id, Lead)
+    assert by_id is by_email
+    assert by_id.first_name == "Renamed"
+    assert LeadService.get_lead(db, lead.id + 1) is None
+    assert LeadService.get_lead_by_email(db, "missing@example.com") is None
+
+def test_create_with_a_new_email_inserts_and_logs_a_creation(db):
+    lead = LeadService.create_lead(db, _new_lead("a@example.com"))
+
+    assert lead.id is not None
+    assert _actions(db, lead.id) == ["lead.created"]
+
+def test_create_with_a_taken_email_updates_and_logs_an_update(db):
+    first = LeadService.create_lead(db, _new_lead("a@example.com", company="Old Co"))
+    # Within the same second as the insert, so timestamps can't tell them apart
+    second = LeadService.create_lead(db, _new_lead("a@example.com", company="New Co"))
+
+    assert second.id == first.id
+    assert second.company == "New Co"
+    assert db.scalars(select(Lead.id)).all() == [first.id]
+    assert _actions(db, first.id) == ["lead.created", "lead.updated"]
+
+def test_leads_without_email_are_always_inserted(db):
+    first = LeadService.create_lead(db, _new_lead())
+    second = LeadService.create_lead(db, _new_lead())
+
+    assert first.id != second.id
+    assert _actions(db, second.id) == ["lead.created"]
+
+def test_cursor_round_trips():
+    created_at = datetime(2024, 5, 1, 12, 30, 15)
+
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_malformed_cursor_is_rejected(db, cursor):
+    with pytest.raises(ValueError):
+        LeadService.get_leads(db, cursor=cursor)
+
+def _seed_leads(db, count):
+    for n in range(count):
+        LeadService.create_lead(db, _new_lead(f"lead{n}@example.com"))
+    # One statement's now() puts every lead on the same timestamp, stored the
+    # way the column default stores it, so only the id orders them
+    db.execute(update(Lead).values(created_at=func.now()))
+    db.commit()
+
+def _page_ids(page):
+    return [lead.id for lead in page["items"]]
+
+def test_cursor_pages_through_ties_without_gaps_or_repeats(db):
+    _seed_leads(db, 5)
+
+    seen = []
+    page = LeadService.get_leads(db, limit=2)
+    seen += _page_ids(page)
+    while page["has_more"]:
+        page = LeadService.get_leads(db, limit=2, cursor=page["next_cursor"])
+        seen += _page_ids(page)
+
+    assert seen == sorted(db.scalars(select(Lead.id)).all(), reverse=True)
+    assert page["next_cursor"] is None
+
+def test_cursor_survives_deleting_the_last_row_of_the_page(db):
+    _seed_leads(db, 4)
+    first = LeadService.get_leads(db, limit=2)
+
+    LeadService.delete_lead(db, _page_ids(first)[-1])
+    second = LeadService.get_leads(db, limit=2, cursor=first["next_cursor"])
+
+    all_ids = sorted(db.scalars(select(Lead.id)).all(), reverse=True)
+    assert _page_ids(second) == [i for i in all_ids if i < _page_ids(first)[-1]]
+
+def test_total_counts_every_match(db):
+    _seed_leads(db, 3)
+
+    page = LeadService.get_leads(db, limit=2, with_total=True)
+
+    assert page["total"] == 3
+    assert page["has_more"]
+    assert LeadService.get_leads(db, limit=2)["total"] is None
@@ -0,0 +1,72 @@
+"""
+Lead source/status breakdowns and the cache in front of them.
+"""
+from app.models import Lead
+from app.schemas.lead import LeadCreate, LeadSource, LeadStatus, LeadUpdate
+from app.services.lead_service import LeadService
+
+def _new_lead(email, source=LeadSource.WEBSITE, status=LeadStatus.NEW):
+    return LeadCreate(
+        first_name="Test",
+        last_name="Lead",
+        email=email,
+        phone="5551234567",
+        source=source,
+        status=status,
+    )
+
+def _by_source(stats):
+    return {row["source"]: row for row in stats}
+
+def test_source_stats_count_and_convert_per_source(db):
+    LeadService.create_lead(db, _new_lead("a@example.com", LeadSource.WEBSITE, LeadStatus.WON))
+    LeadService.create_lead(db, _new_lead("b@example.com", LeadSource.WEBSITE))
+    LeadService.create_lead(db, _new_lead("c@example.com", LeadSource.REFERRAL))
+
+    stats = LeadService.get_lead_source_stats(db)
+
+    website = _by_source(stats)[LeadSource.WEBSITE]
+    assert website["total_leads"] == 2
+    assert website["converted_leads"] == 1
+    assert website["conversion_rate"] == 50.0
+    assert _by_source(stats)[LeadSource.REFERRAL]["total_leads"] == 1
+    # Best conversion rate first
+    assert stats[0]["source"] == LeadSource.WEBSITE
+
+def test_source_stats_limit_keeps_the_top_sources(db):
+    LeadService.create_lead(db, _new_lead("a@example.com", LeadSource.WEBSITE, LeadStatus.WON))
+    LeadService.create_lead(db, _new_lead("b@example.com", LeadSource.REFERRAL))
+
+    stats = LeadService.get_lead_source_stats(db, limit=1)
+
+    assert [row["source"] for row in stats] == [LeadSource.WEBSITE]
+
+def test_stats_are_served_from_cache_until_a_lead_write(db):
+    LeadService.create_lead(db, _new_lead("a@example.com"))
+    cached = LeadService.get_lead_source_stats(db)
+
+    # A row written behind the service's back isn't seen while cached
+    db.add(Lead(first_name="Raw", last_name="Insert", phone="5551234567", source=LeadSource.WEBSITE))
+    db.commit()
+    assert LeadService.get_lead_source_stats(db) == cached
+
+    LeadService.create_lead(db, _new_lead("b@example.com"))
+    assert _by_source(LeadService.get_lead_source_stats(db))[LeadSource.WEBSITE]["total_leads"] == 3
+
+def test_update_and_delete_clear_the_cached_stats(db):
+    lead = LeadService.create_lead(db, _new_lead("a@example.com"))
+    assert LeadService.get_lead_status_stats(db) == [{"status": LeadStatus.NEW, "count": 1}]
+
+    LeadService.update_lead(db, lead.id, LeadUpdate(status=LeadStatus.WON))
+    assert LeadService.get_lead_status_stats(db) == [{"status": LeadStatus.WON, "count": 1}]
+
+    assert LeadService.delete_lead(db, lead.id)
+    assert LeadService.get_lead_status_stats(db) == []
+
+def test_conversion_clears_the_cached_stats(db):
+    lead = LeadService.create_lead(db, _new_lead("a@example.com"))
+    assert _by_source(LeadService.get_lead_source_stats(db))[LeadSource.WEBSITE]["converted_leads"] == 0
+
+    LeadService.convert_to_customer(db, lead.id)
+
+    assert _by_source(LeadService.get_lead_source_stats(db))[LeadSource.WEBSITE]["converted_leads"] == 1
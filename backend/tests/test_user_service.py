@@ -0,0 +1,42 @@
+"""
+User lookups go to the database on every call, so updates show up at once.
+"""
+import asyncio
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import User
+
+user_schemas = pytest.importorskip(
+    "app.schemas.user", reason="the user schemas module is not part of this tree yet"
+)
+from app.services.user_service import UserService  # noqa: E402
+
+def _add_user(db, email):
+    user = User(email=email, hashed_password="not-a-real-hash", first_name="Test", last_name="User")
+    db.add(user)
+    db.commit()
+    return user
+
+def test_lookups_find_the_user_by_id_and_email(db):
+    user = _add_user(db, "a@example.com")
+
+    assert asyncio.run(UserService.get_user(db, user.id)) is user
+    assert asyncio.run(UserService.get_user_by_email(db, "a@example.com")) is user
+    assert asyncio.run(UserService.get_user(db, user.id + 1)) is None
+    assert asyncio.run(UserService.get_user_by_email(db, "missing@example.com")) is None
+
+def test_updates_are_seen_by_the_next_lookup(db):
+    user = _add_user(db, "a@example.com")
+    # A lookup before the update, as a request would have made
+    asyncio.run(UserService.get_user(db, user.id))
+
+    asyncio.run(UserService.update_user(db, user.id, user_schemas.UserUpdate(first_name="Renamed")))
+
+    other = SessionLocal()
+    try:
+        assert asyncio.run(UserService.get_user(other, user.id)).first_name == "Renamed"
+        assert asyncio.run(UserService.get_user_by_email(other, "a@example.com")).first_name == "Renamed"
+    finally:
+        other.close()
@@ -72,7 +72,7 @@ BACKEND_DOCKERFILE = (
     "RUN pip install --no-cache-dir -r requirements.txt\n"
     "COPY app ./app\n"
     "EXPOSE 8000\n"
-    'CMD ["uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000"]\n'
+    'CMD ["uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000", "--loop", "uvloop", "--http", "httptools"]\n'
 )
 
 REQUIREMENTS = (
@@ -82,6 +82,7 @@ REQUIREMENTS = (
     "SQLAlchemy==2.0.32\n"
     "httpx==0.27.0\n"
     "python-dotenv==1.0.1\n"
+    "orjson==3.10.7\n"
 )
 
 ENV_EXAMPLE = (
@@ -105,12 +106,21 @@ ENV_EXAMPLE = (
 
 MAIN_PY = (
     "import os\n"
+    "import re\n"
+    "import asyncio\n"
+    "import csv\n"
+    "import io\n"
+    "import logging\n"
+    "import sys\n"
+    "from functools import lru_cache\n"
+    "from contextlib import asynccontextmanager\n"
     "from typing import Optional\n"
-    "from fastapi import FastAPI, HTTPException\n"
+    "from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks\n"
     "from fastapi.middleware.cors import CORSMiddleware\n"
-    "from pydantic import BaseModel, EmailStr, Field\n"
-    "from sqlalchemy import create_engine, text\n"
-    "from sqlalchemy.orm import sessionmaker\n"
+    "from fastapi.responses import ORJSONResponse\n"
+    "from pydantic import BaseModel, Field, ValidationError\n"
+    "from sqlalchemy import create_engine, event, text\n"
+    "from sqlalchemy.orm import sessionmaker, Session\n"
     "import httpx\n"
     "from dotenv import load_dotenv\n"
     "\n"
@@ -119,26 +129,90 @@ MAIN_PY = (
     "OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')\n"
     "DB_URL = os.getenv('DB_URL', 'sqlite:///./tesla.db')\n"
     "ALLOWED_ORIGINS = [o.strip() for o in os.getenv('ALLOWED_ORIGINS', '*').split(',')]\n"
+    "TELEGRAM_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')\n"
+    "TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')\n"
+    "TELEGRAM_URL = f'https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage' if TELEGRAM_TOKEN else None\n"
+    "\n"
+    "DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))\n"
+    "\n"
+    "engine = create_engine(\n"
+    "    DB_URL,\n"
+    "    # Compiled SQL cache; the default 500 entries is shared by every statement shape\n"
+    "    query_cache_size=1200,\n"
+    "    connect_args={'check_same_thread': False, 'timeout': 30} if DB_URL.startswith('sqlite') else {},\n"
+    "    pool_size=DB_POOL_SIZE,\n"
+    "    max_overflow=10,\n"
+    "    pool_pre_ping=True,\n"
+    ")\n"
+    "\n"
+    "if DB_URL.startswith('sqlite'):\n"
+    "    @event.listens_for(engine, 'connect')\n"
+    "    def _set_sqlite_pragmas(dbapi_connection, connection_record):\n"
+    "        # WAL lets the chat/lead readers run while a lead is being written\n"
+    "        cursor = dbapi_connection.cursor()\n"
+    "        cursor.execute('PRAGMA journal_mode=WAL')\n"
+    "        cursor.execute('PRAGMA synchronous=NORMAL')\n"
+    "        cursor.execute('PRAGMA temp_store=MEMORY')\n"
+    "        cursor.execute('PRAGMA mmap_size=268435456')\n"
+    "        # 64 MB page cache per connection (negative = KiB), filled as pages are read\n"
+    "        cursor.execute('PRAGMA cache_size=-65536')\n"
+    "        cursor.close()\n"
     "\n"
-    "engine = create_engine(DB_URL, connect_args={'check_same_thread': False} if DB_URL.startswith('sqlite') else {})\n"
     "SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)\n"
     "\n"
-    "with engine.begin() as conn:\n"
-    "    conn.exec_driver_sql(\n"
-    "        '''\n"
-    "        CREATE TABLE IF NOT EXISTS leads (\n"
-    "            id INTEGER PRIMARY KEY AUTOINCREMENT,\n"
-    "            name TEXT NOT NULL,\n"
-    "            email TEXT,\n"
-    "            phone TEXT,\n"
-    "            service TEXT,\n"
-    "            message TEXT,\n"
-    "            created_at DATETIME DEFAULT CURRENT_TIMESTAMP\n"
-    "        )\n"
-    "        '''\n"
+    "# Statements built once at import; SQLAlchemy caches their compiled form\n"
+    "LEAD_COLUMNS = ('name', 'email', 'phone', 'service', 'message')\n"
+    "INSERT_LEAD = text(\n"
+    "    'INSERT INTO leads(name,email,phone,service,message) '\n"
+    "    'VALUES(:name,:email,:phone,:service,:message)'\n"
+    ")\n"
+    "\n"
+    "def get_db():\n"
+    "    db = SessionLocal()\n"
+    "    try:\n"
+    "        yield db\n"
+    "    finally:\n"
+    "        db.close()\n"
+    "\n"
+    "async def warm_connection_pool():\n"
+    "    # Open DB_POOL_SIZE connections up front so the first requests don't pay for them\n"
+    "    def ping():\n"
+    "        with engine.connect() as conn:\n"
+    "            conn.execute(text('SELECT 1'))\n"
+    "    await asyncio.gather(*(asyncio.to_thread(ping) for _ in range(DB_POOL_SIZE)))\n"
+    "\n"
+    "CREATE_LEADS_TABLE = text(\n"
+    "    '''\n"
+    "    CREATE TABLE IF NOT EXISTS leads (\n"
+    "        id INTEGER PRIMARY KEY AUTOINCREMENT,\n"
+    "        name TEXT NOT NULL,\n"
+    "        email TEXT,\n"
+    "        phone TEXT,\n"
+    "        service TEXT,\n"
+    "        message TEXT,\n"
+    "        created_at DATETIME DEFAULT CURRENT_TIMESTAMP\n"
+    "    )\n"
+    "    '''\n"
+    ")\n"
+    "CREATE_LEADS_CREATED_INDEX = text(\n"
+    "    'CREATE INDEX IF NOT EXISTS ix_leads_created_at ON leads(created_at DESC, id DESC)'\n"
+    ")\n"
+    "\n"
+    "@asynccontextmanager\n"
+    "async def lifespan(app):\n"
+    "    with engine.begin() as conn:\n"
+    "        conn.execute(CREATE_LEADS_TABLE)\n"
+    "        conn.execute(CREATE_LEADS_CREATED_INDEX)\n"
+    "    await warm_connection_pool()\n"
+    "    # Shared client so Telegram posts reuse the pooled TLS connection\n"
+    "    app.state.http = httpx.AsyncClient(\n"
+    "        timeout=10, limits=httpx.Limits(max_keepalive_connections=20)\n"
     "    )\n"
+    "    yield\n"
+    "    await app.state.http.aclose()\n"
+    "    engine.dispose()\n"
     "\n"
-    "app = FastAPI(title='Tesla CRM API')\n"
+    "app = FastAPI(title='Tesla CRM API', lifespan=lifespan, default_response_class=ORJSONResponse)\n"
     "app.add_middleware(\n"
     "    CORSMiddleware,\n"
     "    allow_origins=['*'] if '*' in ALLOWED_ORIGINS else ALLOWED_ORIGINS,\n"
@@ -149,7 +223,8 @@ MAIN_PY = (
     "\n"
     "class LeadIn(BaseModel):\n"
     "    name: str = Field(..., min_length=2)\n"
-    "    email: Optional[EmailStr] = None\n"
+    "    # Plain shape check; full RFC 5322 parsing isn't worth it for a contact form\n"
+    "    email: Optional[str] = Field(None, pattern=r'^[^@\\s]+@[^@\\s]+\\.[^@\\s]+$')\n"
     "    phone: str = Field(..., min_length=6)\n"
     "    service: Optional[str] = None\n"
     "    message: Optional[str] = None\n"
@@ -166,32 +241,56 @@ MAIN_PY = (
     "    return {'ok': True}\n"
     "\n"
     "@app.post('/api/leads')\n"
-    "async def create_lead(payload: LeadIn):\n"
+    "async def create_lead(payload: LeadIn, background_tasks: BackgroundTasks,\n"
+    "                      db: Session = Depends(get_db)):\n"
     "    if payload.name.lower().startswith('http'):\n"
     "        raise HTTPException(status_code=400, detail='Invalid name')\n"
-    "    with engine.begin() as conn:\n"
-    "        conn.execute(text(\n"
-    "            'INSERT INTO leads(name,email,phone,service,message) '\n"
-    "            'VALUES(:name,:email,:phone,:service,:message)'\n"
-    "        ), payload.model_dump())\n"
-    "    await notify_telegram(payload)\n"
+    "    persist_lead(db, payload, background_tasks)\n"
     "    return {'ok': True}\n"
     "\n"
+    "def persist_lead(db: Session, lead: LeadIn, background_tasks: BackgroundTasks):\n"
+    "    # Single write path for leads; Telegram is notified after the response is sent\n"
+    "    db.execute(INSERT_LEAD, {\n"
+    "        'name': lead.name, 'email': lead.email, 'phone': lead.phone,\n"
+    "        'service': lead.service, 'message': lead.message,\n"
+    "    })\n"
+    "    db.commit()\n"
+    "    background_tasks.add_task(notify_telegram, lead)\n"
+    "\n"
+    "def bulk_create_leads(leads: list[LeadIn]) -> int:\n"
+    "    # Imports and seeding: the whole batch goes in one transaction, with no\n"
+    "    # Telegram notification per row. PostgreSQL (psycopg2) streams it through COPY;\n"
+    "    # SQLite gets a single executemany.\n"
+    "    rows = [(lead.name, lead.email, lead.phone, lead.service, lead.message) for lead in leads]\n"
+    "    if not rows:\n"
+    "        return 0\n"
+    "    if engine.dialect.name == 'postgresql':\n"
+    "        buf = io.StringIO()\n"
+    "        csv.writer(buf).writerows(rows)\n"
+    "        buf.seek(0)\n"
+    "        raw = engine.raw_connection()\n"
+    "        try:\n"
+    "            with raw.cursor() as cur:\n"
+    "                cur.copy_expert('COPY leads(name,email,phone,service,message) FROM STDIN CSV', buf)\n"
+    "            raw.commit()\n"
+    "        finally:\n"
+    "            raw.close()\n"
+    "    else:\n"
+    "        with engine.begin() as conn:\n"
+    "            conn.execute(INSERT_LEAD, [dict(zip(LEAD_COLUMNS, row)) for row in rows])\n"
+    "    return len(rows)\n"
+    "\n"
     "async def notify_telegram(lead: LeadIn):\n"
-    "    token = os.getenv('TELEGRAM_BOT_TOKEN')\n"
-    "    chat_id = os.getenv('TELEGRAM_CHAT_ID')\n"
-    "    if not token or not chat_id:\n"
+    "    if TELEGRAM_URL is None or not TELEGRAM_CHAT_ID:\n"
     "        return\n"
     "    text_msg = (\n"
     "        f'Nuevo lead:\\nNombre: {lead.name}\\nEmail: {lead.email}\\nTel: {lead.phone}\\n'\n"
     "        f'Servicio: {lead.service}\\nMensaje: {lead.message}'\n"
     "    )\n"
-    "    url = f'https://api.telegram.org/bot{token}/sendMessage'\n"
-    "    async with httpx.AsyncClient(timeout=10) as client:\n"
-    "        try:\n"
-    "            await client.post(url, json={'chat_id': chat_id, 'text': text_msg})\n"
-    "        except Exception:\n"
-    "            pass\n"
+    "    try:\n"
+    "        await app.state.http.post(TELEGRAM_URL, json={'chat_id': TELEGRAM_CHAT_ID, 'text': text_msg})\n"
+    "    except Exception:\n"
+    "        pass\n"
     "\n"
     "KEYS = {\n"
     "    'itse': ['itse','licencia','inspección','inspeccion'],\n"
@@ -200,29 +299,66 @@ MAIN_PY = (
     "    'inc':  ['incendio','incendios','alarma','detección','detector']\n"
     "}\n"
     "\n"
-    "def rule_based_reply(text: str) -> str:\n"
-    "    t = text.lower()\n"
-    "    if any(k in t for k in KEYS['itse']):\n"
-    "        return ('ITSE: pago municipal aprox. S/ 218 y gestión desde S/ 300 (referencial). '\n"
-    "                'Para precisión: rubro y área en m². ¿Agendamos visita técnica sin costo?')\n"
-    "    if any(k in t for k in KEYS['pozo']):\n"
-    "        return ('Pozo de tierra: S/ 1,500 – 2,500 (referencial, depende del terreno). '\n"
-    "                'Podemos medir resistencia y proponer solución. ¿Dirección para visita?')\n"
-    "    if any(k in t for k in KEYS['mant']):\n"
-    "        return ('Mantenimiento: plan a medida (preventivo/correctivo). '\n"
-    "                'Cuéntame tamaño del local y equipos críticos para estimar.')\n"
-    "    if any(k in t for k in KEYS['inc']):\n"
-    "        return ('Contra incendios: diseño, detección y alarma según normativa. '\n"
-    "                'Costo depende del área y riesgo. ¿Qué tipo de propiedad es?')\n"
-    "    return 'Gracias. Déjanos nombre y número para coordinar una visita técnica.'\n"
+    "# Every keyword in one alternation, each category a named group, so a message\n"
+    "# is scanned once in C whatever the number of categories\n"
+    "KEYS_RE = re.compile('|'.join(\n"
+    "    f\"(?P<{k}>{'|'.join(map(re.escape, words))})\" for k, words in KEYS.items()\n"
+    "))\n"
+    "\n"
+    "def normalize_message(text: str) -> str:\n"
+    "    # Lowercased, whitespace-collapsed form every detector works on\n"
+    "    return ' '.join(text.lower().split())\n"
+    "\n"
+    "# Canned reply per KEYS category; categories are checked in KEYS order\n"
+    "REPLIES = {\n"
+    "    'itse': ('ITSE: pago municipal aprox. S/ 218 y gestión desde S/ 300 (referencial). '\n"
+    "             'Para precisión: rubro y área en m². ¿Agendamos visita técnica sin costo?'),\n"
+    "    'pozo': ('Pozo de tierra: S/ 1,500 – 2,500 (referencial, depende del terreno). '\n"
+    "             'Podemos medir resistencia y proponer solución. ¿Dirección para visita?'),\n"
+    "    'mant': ('Mantenimiento: plan a medida (preventivo/correctivo). '\n"
+    "             'Cuéntame tamaño del local y equipos críticos para estimar.'),\n"
+    "    'inc':  ('Contra incendios: diseño, detección y alarma según normativa. '\n"
+    "             'Costo depende del área y riesgo. ¿Qué tipo de propiedad es?'),\n"
+    "}\n"
+    "DEFAULT_REPLY = 'Gracias. Déjanos nombre y número para coordinar una visita técnica.'\n"
+    "\n"
+    "@lru_cache(maxsize=2048)\n"
+    "def rule_based_reply(t: str) -> str:\n"
+    "    # t must already be normalized, so repeated messages share a cache entry.\n"
+    "    # The earliest category in KEYS order wins, not the earliest match in t.\n"
+    "    found = {m.lastgroup for m in KEYS_RE.finditer(t)}\n"
+    "    for key in KEYS:\n"
+    "        if key in found:\n"
+    "            return REPLIES[key]\n"
+    "    return DEFAULT_REPLY\n"
     "\n"
     "@app.post('/api/chat', response_model=ChatOut)\n"
     "async def chat_route(payload: ChatIn):\n"
-    "    user = payload.message.strip()\n"
+    "    user = normalize_message(payload.message)\n"
     "    if not user:\n"
     "        raise HTTPException(status_code=400, detail='Empty message')\n"
     "    rb = rule_based_reply(user)\n"
     "    return ChatOut(reply=rb)\n"
+    "\n"
+    "if __name__ == '__main__':\n"
+    "    # Lead import: python -m app.main leads.csv\n"
+    "    # (CSV with a header row naming name,email,phone,service,message)\n"
+    "    logging.basicConfig(level=logging.INFO)\n"
+    "    log = logging.getLogger('app.main')\n"
+    "    if len(sys.argv) != 2:\n"
+    "        sys.exit('usage: python -m app.main <leads.csv>')\n"
+    "    with engine.begin() as conn:\n"
+    "        conn.execute(CREATE_LEADS_TABLE)\n"
+    "        conn.execute(CREATE_LEADS_CREATED_INDEX)\n"
+    "    leads = []\n"
+    "    with open(sys.argv[1], newline='', encoding='utf-8') as f:\n"
+    "        # Line 1 is the header\n"
+    "        for line, row in enumerate(csv.DictReader(f), start=2):\n"
+    "            try:\n"
+    "                leads.append(LeadIn(**{k: v or None for k, v in row.items() if k in LEAD_COLUMNS}))\n"
+    "            except ValidationError as e:\n"
+    "                log.warning('line %d skipped: %s', line, e.errors(include_url=False))\n"
+    "    log.info('%d leads imported', bulk_create_leads(leads))\n"
 )
 
 RUN_LOCAL_PS1 = (
@@ -292,6 +428,13 @@ def write_text(path: Path, content: str) -> None:
     if path.name == "index.html" and path.exists():
         print(f"• Manteniendo tu archivo existente: {path}")
         return
+    # Si el contenido no cambió no reescribimos: se conserva la fecha de
+    # modificación y uvicorn --reload no reinicia por nada
+    if path.exists():
+        with open(path, encoding="utf-8", newline="") as f:
+            if f.read() == content:
+                print(f"• Sin cambios: {path}")
+                return
     with open(path, "w", encoding="utf-8", newline="\n") as f:
         f.write(content)
     print(f"• Archivo creado: {path}")